@@ -0,0 +1,29 @@
+"""Add normalized_name pattern index to SchoolEntity
+
+Revision ID: 9c41d7e2a5b8
+Revises: ec7233d07f68
+Create Date: 2026-10-16 10:12:37.412904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c41d7e2a5b8'
+down_revision = 'ec7233d07f68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # text_pattern_ops lets PostgreSQL use the index for LIKE 'prefix%' under
+    # any collation; other dialects ignore the option
+    with op.batch_alter_table('school_entity', schema=None) as batch_op:
+        batch_op.create_index('ix_school_entity_normalized_name_pattern', ['normalized_name'], unique=False,
+                              postgresql_ops={'normalized_name': 'text_pattern_ops'})
+
+
+def downgrade():
+    with op.batch_alter_table('school_entity', schema=None) as batch_op:
+        batch_op.drop_index('ix_school_entity_normalized_name_pattern')
@@ -118,6 +118,9 @@ class SchoolEntity(db.Model):
     __table_args__ = (
         db.UniqueConstraint('entity_type', 'normalized_name', 'county', name='uix_entity_type_name_county'),
         db.Index('ix_entity_county_name', 'county', 'normalized_name'),
+        # Lets PostgreSQL serve prefix LIKE 'token%' lookups from an index
+        db.Index('ix_school_entity_normalized_name_pattern', 'normalized_name',
+                 postgresql_ops={'normalized_name': 'text_pattern_ops'}),
     )
 
     @staticmethod
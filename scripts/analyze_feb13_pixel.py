@@ -21,7 +21,8 @@ PDF_PATH = PROJECT_ROOT / "Official_Calendars" / "Public" / "Butts" / "ButtsScho
 def analyze_calendar():
     """Analyze pixel colors in the calendar."""
     print("Converting PDF at DPI 300...")
-    images = convert_from_path(str(PDF_PATH), dpi=300, poppler_path='/opt/homebrew/bin')
+    images = convert_from_path(str(PDF_PATH), dpi=300, poppler_path='/opt/homebrew/bin',
+                               first_page=1, last_page=1)
     img = images[0]
 
     print(f"Image size: {img.size}")
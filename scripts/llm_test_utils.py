@@ -0,0 +1,118 @@
+"""
+Helpers shared by the calendar LLM experiment scripts (test_output_formats*.py,
+test_final_approaches.py, test_feb_detection_v3.py, test_dpi_preprocessing_v2.py):
+concurrent test runs with readable output, atomic cache writes, JSON extraction
+from model responses and the February crop of the test calendar page.
+"""
+
+import io
+import json
+import os
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# orjson parses the fenced answer faster when installed; its decode error
+# subclasses json.JSONDecodeError, so the except clauses cover both
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# February '26 grid of the test calendar as (left, top, right, bottom) page
+# fractions: middle column, 3rd row group of the 3x4 month layout
+FEB_PRECISE_CROP = (0.34, 0.54, 0.65, 0.68)
+
+# ```json ... ``` fenced block in a model response
+_JSON_FENCE = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+_JSON_DECODER = json.JSONDecoder()
+
+
+class _ThreadBufferedStdout:
+    """sys.stdout proxy that buffers prints per worker thread.
+
+    Lets tests run concurrently while each one's output is still printed
+    as a contiguous block once it finishes.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def write(self, text):
+        return getattr(self._local, "buffer", self._stream).write(text)
+
+    def flush(self):
+        getattr(self._local, "buffer", self._stream).flush()
+
+    def run(self, fn, *args):
+        """Call fn(*args) in this thread with its prints captured."""
+        self._local.buffer = io.StringIO()
+        try:
+            return fn(*args), self._local.buffer.getvalue()
+        finally:
+            del self._local.buffer
+
+
+def run_concurrently(tests):
+    """Run (fn, *args) tuples in parallel; print each test's output in order."""
+    stdout = _ThreadBufferedStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=len(tests)) as pool:
+            futures = [pool.submit(stdout.run, *test) for test in tests]
+            outcomes = [future.result() for future in futures]
+    finally:
+        sys.stdout = stdout._stream
+
+    results = []
+    for result, output in outcomes:
+        print(output, end="")
+        results.append(result)
+    return results
+
+
+def write_atomic(path: Path, data: bytes):
+    """Write data to path via a temp file + rename so readers never see a partial file."""
+    # Per-thread temp name, so concurrent writers of one entry don't collide
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def read_cache(path: Path):
+    """JSON cache entry at path, or None when it is missing or unreadable.
+
+    A truncated or corrupt entry is treated as a cache miss, so the request
+    is simply re-sent and the entry rewritten.
+    """
+    try:
+        return json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+
+def extract_json_from_response(response_text: str) -> dict:
+    """Extract JSON from response text."""
+    # Try markdown code blocks first
+    json_match = _JSON_FENCE.search(response_text)
+    if json_match:
+        try:
+            return _loads(json_match.group(1).strip())
+        except json.JSONDecodeError:
+            pass
+
+    # Let the C decoder find where each candidate object ends; unlike a
+    # brace counter it is not fooled by braces inside string values
+    start = response_text.find('{')
+    while start != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(response_text, start)
+            return obj
+        except json.JSONDecodeError:
+            start = response_text.find('{', start + 1)
+
+    return {}
@@ -79,7 +79,8 @@ class DPIPreprocessingTester:
                              image_format: str = "PNG",
                              contrast_factor: float = None) -> bytes:
         """Convert PDF to image with specified parameters."""
-        images = convert_from_path(pdf_path, dpi=dpi, poppler_path='/opt/homebrew/bin')
+        images = convert_from_path(pdf_path, dpi=dpi, poppler_path='/opt/homebrew/bin',
+                                   first_page=1, last_page=1)
 
         if not images:
             raise ValueError("No images extracted from PDF")
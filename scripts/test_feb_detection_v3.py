@@ -13,7 +13,9 @@ New approaches:
 import os
 import sys
 import json
+import argparse
 import base64
+import functools
 import io
 from pathlib import Path
 
@@ -28,12 +30,17 @@ try:
 except ImportError:
     pass
 
+from scripts.llm_test_utils import extract_json_from_response
+
 import anthropic
 from pdf2image import convert_from_path
 from PIL import Image, ImageEnhance
 
 PDF_PATH = PROJECT_ROOT / "Official_Calendars" / "Public" / "Butts" / "ButtsSchoolYearCalendar2025-2026_FINAL_Approved1112.pdf"
 
+# Longest image edge Claude accepts without resizing server-side
+MAX_IMAGE_EDGE = 1568
+
 
 class FebDetectionTester:
     def __init__(self):
@@ -43,7 +50,8 @@ class FebDetectionTester:
         self.client = anthropic.Anthropic(api_key=api_key)
 
     def convert_pdf(self, dpi: int = 300) -> Image.Image:
-        images = convert_from_path(str(PDF_PATH), dpi=dpi, poppler_path='/opt/homebrew/bin')
+        images = convert_from_path(str(PDF_PATH), dpi=dpi, poppler_path='/opt/homebrew/bin',
+                                   first_page=1, last_page=1)
         return images[0]
 
     def crop_february(self, img: Image.Image) -> Image.Image:
@@ -66,67 +74,61 @@ class FebDetectionTester:
         return img.crop((left, top, right, bottom))
 
     def image_to_bytes(self, img: Image.Image) -> bytes:
+        # Claude downscales anything larger server-side; do it here instead
+        if max(img.size) > MAX_IMAGE_EDGE:
+            img = img.copy()
+            img.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
         buffer = io.BytesIO()
         img.save(buffer, format='PNG')
         return buffer.getvalue()
 
-    def analyze(self, image_bytes: bytes, prompt: str) -> dict:
-        base64_image = base64.standard_b64encode(image_bytes).decode("utf-8")
-
+    def image_block(self, image_bytes: bytes, cache: bool = False) -> dict:
+        """Base64 PNG content block, optionally marked for prompt caching."""
+        block = {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": "image/png",
+                "data": base64.standard_b64encode(image_bytes).decode("ascii")
+            }
+        }
+        if cache:
+            block["cache_control"] = {"type": "ephemeral"}
+        return block
+
+    @functools.cached_property
+    def _pdf_b64(self) -> str:
+        """Base64-encoded PDF, read and encoded once per tester."""
+        return base64.standard_b64encode(PDF_PATH.read_bytes()).decode("ascii")
+
+    def pdf_block(self) -> dict:
+        """The raw calendar PDF as a document content block."""
+        return {
+            "type": "document",
+            "source": {
+                "type": "base64",
+                "media_type": "application/pdf",
+                "data": self._pdf_b64
+            }
+        }
+
+    def send(self, content: list) -> str:
+        """Send one user message and return the response text."""
         response = self.client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=2048,
-            messages=[{
-                "role": "user",
-                "content": [
-                    {
-                        "type": "image",
-                        "source": {
-                            "type": "base64",
-                            "media_type": "image/png",
-                            "data": base64_image
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": prompt
-                    }
-                ]
-            }]
+            messages=[{"role": "user", "content": content}]
         )
-
         return response.content[0].text
 
+    def analyze(self, image_bytes: bytes, prompt: str) -> str:
+        # Same page is sent by several tests; cache its tokens
+        return self.send([self.image_block(image_bytes, cache=True),
+                          {"type": "text", "text": prompt}])
+
     def analyze_with_pdf(self, prompt: str) -> str:
         """Send the raw PDF to Claude (uses document understanding)."""
-        with open(PDF_PATH, 'rb') as f:
-            pdf_bytes = f.read()
-
-        base64_pdf = base64.standard_b64encode(pdf_bytes).decode("utf-8")
-
-        response = self.client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2048,
-            messages=[{
-                "role": "user",
-                "content": [
-                    {
-                        "type": "document",
-                        "source": {
-                            "type": "base64",
-                            "media_type": "application/pdf",
-                            "data": base64_pdf
-                        }
-                    },
-                    {
-                        "type": "text",
-                        "text": prompt
-                    }
-                ]
-            }]
-        )
-
-        return response.content[0].text
+        return self.send([self.pdf_block(), {"type": "text", "text": prompt}])
 
     def test_cropped_february(self):
         """Test 1: Crop to just February."""
@@ -282,8 +284,72 @@ Return a simple list of colored dates with their colors."""
 
         return detected_count > 0
 
+    def test_batched(self) -> dict:
+        """Tests 1-4 in a single request: every image plus the PDF, one prompt.
+
+        Multiple-runs consistency (test 5) needs independent calls, so it is
+        not part of the batch.
+        """
+        print("\n" + "="*60)
+        print("BATCHED: tests 1-4 in one request")
+        print("="*60)
+
+        img = self.convert_pdf(dpi=300)
+        feb_img = self.crop_february(self.convert_pdf(dpi=400))
+        saturated = ImageEnhance.Color(img).enhance(1.5)
+
+        # Each view is introduced by a label naming the JSON key its answer
+        # goes under, so answers cannot be attributed to the wrong view
+        views = [
+            ("Image 1", "cropped", "ONLY the February '26 section, cropped",
+             self.image_block(self.image_to_bytes(feb_img))),
+            ("Image 2", "explicit_yellow", "the full calendar page",
+             self.image_block(self.image_to_bytes(img))),
+            ("Image 3", "comparison", "the full calendar page with saturation boosted",
+             self.image_block(self.image_to_bytes(saturated))),
+            ("Document", "pdf_direct", "the original PDF",
+             self.pdf_block()),
+        ]
+        content = []
+        for label, key, description, block in views:
+            content.append({"type": "text", "text": f'{label} (answer under "{key}"): {description}'})
+            content.append(block)
+
+        prompt = """You were given four labelled views of the same school calendar:
+Image 1 -> "cropped", Image 2 -> "explicit_yellow", Image 3 -> "comparison",
+Document -> "pdf_direct".
+
+According to the legend, YELLOW = Teacher Workday and BLUE = Holiday.
+For EACH view independently, decide whether February 13, 2026 has a
+yellow (or any non-white) background. In Image 3, also compare the Feb 13
+cell to January 2, which is a confirmed yellow Teacher Workday.
+
+Return ONLY JSON with exactly these keys:
+{
+    "cropped": {"feb_13_colored": true/false, "colored_dates": ["Feb X", ...]},
+    "explicit_yellow": {"feb_13_colored": true/false, "colored_dates": ["Feb X", ...]},
+    "comparison": {"feb_13_colored": true/false, "same_as_jan_2": true/false},
+    "pdf_direct": {"feb_13_colored": true/false, "colored_dates": ["Feb X", ...]}
+}"""
+        content.append({"type": "text", "text": prompt})
+
+        response = self.send(content)
+        print(f"\nResponse:\n{response}")
+
+        parsed = extract_json_from_response(response)
+
+        return {
+            key: bool(parsed.get(key, {}).get("feb_13_colored"))
+            for _, key, _, _ in views
+        }
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Feb 13 detection tests")
+    parser.add_argument("--batched", action="store_true",
+                        help="Run tests 1-4 as a single multi-image request")
+    args = parser.parse_args()
+
     print("="*60)
     print("FEBRUARY 13 DETECTION TESTS")
     print("Target: Detect yellow (Teacher Workday) on Feb 13")
@@ -294,10 +360,13 @@ def main():
     results = {}
 
     # Run each test
-    results["cropped"] = tester.test_cropped_february()
-    results["explicit_yellow"] = tester.test_explicit_yellow_prompt()
-    results["pdf_direct"] = tester.test_pdf_direct()
-    results["comparison"] = tester.test_side_by_side_comparison()
+    if args.batched:
+        results.update(tester.test_batched())
+    else:
+        results["cropped"] = tester.test_cropped_february()
+        results["explicit_yellow"] = tester.test_explicit_yellow_prompt()
+        results["pdf_direct"] = tester.test_pdf_direct()
+        results["comparison"] = tester.test_side_by_side_comparison()
     results["multiple_runs"] = tester.test_multiple_runs(3)
 
     # Summary
@@ -9,11 +9,15 @@ Tests additional prompt variations:
 5. Direct verification prompt - ask Claude to confirm specific dates before answering
 """
 
+import argparse
 import os
 import sys
 import json
 import base64
+import hashlib
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 from pathlib import Path
 
@@ -30,8 +34,33 @@ try:
 except ImportError:
     pass
 
+from scripts.llm_test_utils import extract_json_from_response, read_cache, write_atomic
+
 import anthropic
 
+# <holiday name="..." start="..." end="..." /> element in the XML format
+_HOLIDAY_XML = re.compile(r'<holiday\s+name="([^"]+)"\s+start="([^"]+)"\s+end="([^"]+)"')
+
+# Rendered pages keyed by a hash of the PDF bytes, DPI and format, so re-runs
+# over the same calendar skip rendering entirely
+PDF_PAGE_CACHE_DIR = PROJECT_ROOT / ".cache" / "pdf_pages"
+# 150 DPI is enough to read the grid; PDF_DPI=200 for A/B accuracy runs
+PDF_DPI = int(os.environ.get("PDF_DPI", "150"))
+# Only the first pages are ever sent, so the rest are never rendered
+MAX_PAGES = 5
+# JPEG is several times smaller to upload than PNG; PDF_IMAGE_FMT=PNG to compare
+IMAGE_FORMAT = os.environ.get("PDF_IMAGE_FMT", "JPEG").upper()
+IMAGE_EXT, IMAGE_MEDIA_TYPE = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "PNG": ("png", "image/png"),
+}[IMAGE_FORMAT]
+
+# Responses keyed by a hash of the full request, so re-runs over the same
+# inputs replay instead of calling the API. --no-cache (NO_LLM_CACHE=1) only
+# replays responses that already scored 100%; add --force to re-call those too
+LLM_CACHE_DIR = PROJECT_ROOT / ".llm_cache"
+BATCH_POLL_SECONDS = 10
+
 # Expected results for validation
 EXPECTED_HOLIDAYS = {
     "MLK Day": {"start": "2026-01-19", "end": "2026-01-19"},
@@ -54,53 +83,324 @@ Different colors mean different things but ALL colored dates = no school for stu
 - Teacher Workday (often yellow) = No school for students"""
 
 
-def pdf_to_images(pdf_path: str):
-    """Convert PDF pages to images."""
+# Format 4: enumerate every coloured date and re-check February in extended
+# thinking, so only the JSON answer comes back as response text
+_PROMPT_TWO_PASS = """Before answering, work through the calendar in your reasoning:
+1. Go month by month from January to May 2026 and note EVERY date that has ANY color (not white), with its color.
+2. Look specifically at the February row and check whether each of Feb 12-17 is colored, and what color.
+
+Then output ONLY the JSON below. Remember:
+- Teacher Workday = Student holiday
+- Combine Friday + Monday holidays that span a weekend
+```json
+{
+    "holidays": [
+        {"name": "MLK Day", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
+        {"name": "Winter Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
+        {"name": "Spring Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
+    ]
+}
+```"""
+
+# Format 5: answer yes/no questions about the key dates before the JSON
+_PROMPT_VERIFICATION = """VERIFICATION QUESTIONS (answer each one first):
+
+Q1: Look at the square for January 19, 2026. Is it colored? YES or NO?
+Q2: Look at the square for February 13, 2026 (this is a Friday). Is it colored? YES or NO? What color?
+Q3: Look at the square for February 16, 2026 (this is Presidents Day Monday). Is it colored? YES or NO?
+Q4: Look at the square for February 17, 2026. Is it colored? YES or NO?
+Q5: Look at the squares for April 6-10, 2026. Are they colored? YES or NO?
+
+ANSWER FORMAT:
+A1: [YES/NO]
+A2: [YES/NO, color if YES]
+A3: [YES/NO]
+A4: [YES/NO]
+A5: [YES/NO]
+
+THEN provide JSON based on your answers:
+- If Feb 13 is colored, Winter Break starts Feb 13 (not Feb 16)
+- Teacher Workday colors count as no-school days
+
+```json
+{
+    "holidays": [
+        {"name": "MLK Day", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
+        {"name": "Winter Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
+        {"name": "Spring Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
+    ]
+}
+```"""
+
+# Format 6: XML with an explicit per-day February breakdown
+_PROMPT_XML = """Analyze the calendar and output holidays in this XML format:
+
+<calendar>
+  <february_analysis>
+    <date day="12" colored="yes/no" color_type="..." />
+    <date day="13" colored="yes/no" color_type="..." />
+    <date day="14" colored="yes/no" color_type="..." />
+    <date day="15" colored="yes/no" color_type="..." />
+    <date day="16" colored="yes/no" color_type="..." />
+    <date day="17" colored="yes/no" color_type="..." />
+  </february_analysis>
+
+  <holidays>
+    <holiday name="MLK Day" start="YYYY-MM-DD" end="YYYY-MM-DD" />
+    <holiday name="Winter Break" start="YYYY-MM-DD" end="YYYY-MM-DD" />
+    <holiday name="Spring Break" start="YYYY-MM-DD" end="YYYY-MM-DD" />
+  </holidays>
+</calendar>
+
+IMPORTANT:
+- Check Feb 13 carefully - it's often a Teacher Workday (colored yellow)
+- Teacher Workday = no school for students
+- If Feb 13 AND Feb 16 are both colored, Winter Break is Feb 13-17"""
+
+# Format 7: read the February grid row by row before the JSON
+_PROMPT_ROW_BY_ROW = """Read the calendar like you're reading a book - LEFT TO RIGHT, TOP TO BOTTOM.
+
+For FEBRUARY 2026 only, read each row of the calendar grid:
+- Row 1 (first week): What dates are shown? Any colored?
+- Row 2 (second week): What dates, any colored?
+- Row 3 (third week, should include Feb 13): What dates, any colored? IS FEB 13 COLORED?
+- Row 4 (fourth week, should include Feb 16): What dates, any colored?
+
+For each colored date in February, note:
+- The date number
+- The color
+- Whether it's "Holiday", "Teacher Workday", or other
+
+THEN output JSON:
+```json
+{
+    "february_colored_dates": [
+        {"date": "2026-02-XX", "color": "...", "type": "..."}
+    ],
+    "holidays": [
+        {"name": "MLK Day", "start_date": "2026-01-19", "end_date": "2026-01-19"},
+        {"name": "Winter Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
+        {"name": "Spring Break", "start_date": "2026-04-06", "end_date": "2026-04-10"}
+    ]
+}
+```
+
+REMEMBER: Teacher Workday = Student Holiday (combine with adjacent holidays)"""
+
+
+# Output budgets sized to the answers each format actually produces; a
+# truncated response is retried once with double the budget
+# Format 4 reasons in extended thinking; max_tokens must cover the thinking
+# budget plus the visible answer
+THINKING_BUDGET_TWO_PASS = 2000
+MAX_TOKENS_TWO_PASS = THINKING_BUDGET_TWO_PASS + 1500
+MAX_TOKENS_VERIFICATION = 1500
+MAX_TOKENS_XML = 1500
+MAX_TOKENS_ROW_BY_ROW = 2000
+
+
+def pdf_to_b64_images(pdf_path: str):
+    """Convert PDF pages to base64-encoded images."""
     try:
-        from pdf2image import convert_from_path
+        pdf_bytes = Path(pdf_path).read_bytes()
+        key = hashlib.sha256(pdf_bytes + f"dpi={PDF_DPI};fmt={IMAGE_FORMAT};pages={MAX_PAGES}".encode()).hexdigest()
+        cache_dir = PDF_PAGE_CACHE_DIR / key
+        manifest = cache_dir / 'manifest.json'
+
+        # The manifest is written last, so its presence means every page is there
+        if manifest.exists():
+            n_pages = json.loads(manifest.read_text())['pages']
+            return [
+                base64.standard_b64encode((cache_dir / f"page_{i}.{IMAGE_EXT}").read_bytes()).decode("ascii")
+                for i in range(n_pages)
+            ]
+
+        import pypdfium2 as pdfium
         import io
 
-        images = convert_from_path(pdf_path, dpi=200, poppler_path='/opt/homebrew/bin')
-        image_bytes_list = []
-
-        for img in images:
+        # Rendered in-process by PDFium, with no poppler subprocess per page
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            images = []
+            for i in range(min(len(pdf), MAX_PAGES)):
+                page = pdf[i]
+                try:
+                    images.append(page.render(scale=PDF_DPI / 72).to_pil())
+                finally:
+                    page.close()
+        finally:
+            pdf.close()
+
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+        def encode_page(i, img):
             buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            image_bytes_list.append(buffer.getvalue())
+            if IMAGE_FORMAT == 'JPEG':
+                # No chroma subsampling, so thin coloured day cells keep their colour
+                img.save(buffer, format='JPEG', quality=85, optimize=True, subsampling=0)
+            else:
+                img.save(buffer, format='PNG')
+            # getbuffer() is a view of the encoded image, so neither the cache
+            # write nor the base64 encode copies it first
+            encoded = buffer.getbuffer()
+            write_atomic(cache_dir / f"page_{i}.{IMAGE_EXT}", encoded)
+            return base64.standard_b64encode(encoded).decode("ascii")
+
+        # Pillow releases the GIL while encoding, so pages encode in parallel
+        with ThreadPoolExecutor() as pool:
+            b64_images = list(pool.map(encode_page, range(len(images)), images))
 
-        return image_bytes_list
+        write_atomic(manifest, json.dumps({'pages': len(b64_images)}).encode())
+
+        return b64_images
     except Exception as e:
         print(f"Error converting PDF: {e}")
         return []
 
 
-def extract_json_from_response(response_text: str) -> dict:
-    """Extract JSON from response text."""
-    json_match = re.search(r'```(?:json)?\s*(.*?)```', response_text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(1).strip())
-        except:
-            pass
-
-    start = response_text.find('{')
-    if start != -1:
-        depth = 0
-        end = start
-        for i, c in enumerate(response_text[start:], start):
-            if c == '{':
-                depth += 1
-            elif c == '}':
-                depth -= 1
-                if depth == 0:
-                    end = i + 1
-                    break
-        try:
-            return json.loads(response_text[start:end])
-        except:
-            pass
+def build_request(content: list, *, model: str = "claude-sonnet-4-20250514",
+                  max_tokens: int = 4096, system: str = BASE_SYSTEM,
+                  thinking_budget: int = None) -> dict:
+    """Messages API params for one user message.
+
+    Every format sends the same pages and system prompt, so both are marked
+    for prompt caching; only the per-format instructions after the last
+    image are billed at the full input rate once the prefix is cached.
+    """
+    last_image = max(i for i, block in enumerate(content) if block["type"] == "image")
+    content[last_image] = {**content[last_image], "cache_control": {"type": "ephemeral"}}
+    params = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}],
+        "messages": [{"role": "user", "content": content}],
+    }
+    if thinking_budget:
+        params["thinking"] = {"type": "enabled", "budget_tokens": thinking_budget}
+    return params
+
+
+def _response_text(message) -> str:
+    """Text of a response, skipping any thinking blocks that precede it."""
+    return next(block.text for block in message.content if block.type == "text")
+
+
+def _build_content(image_blocks: list, prompt_text: str) -> list:
+    """User message content: the shared page images followed by one format's instructions."""
+    content = list(image_blocks)
+    content.append({"type": "text", "text": prompt_text})
+    return content
+
+
+def build_image_contents(b64_images: list) -> list:
+    """Wrap base64 page images into reusable message content blocks."""
+    return [
+        {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": IMAGE_MEDIA_TYPE,
+                "data": b64_image
+            }
+        }
+        for b64_image in b64_images
+    ]
+
+
+def _cache_file(params: dict) -> Path:
+    request = json.dumps(params, sort_keys=True)
+    return LLM_CACHE_DIR / f"{hashlib.sha256(request.encode()).hexdigest()}.json"
+
+
+def _cache_response(params: dict, response_text: str):
+    LLM_CACHE_DIR.mkdir(exist_ok=True)
+    write_atomic(_cache_file(params), json.dumps({"text": response_text}).encode())
+
+
+def record_result(params: dict, result: dict):
+    """Store a parsed result's validation next to its cached response."""
+    cache_file = _cache_file(params)
+    cached = read_cache(cache_file)
+    if cached is None:
+        return
+    cached["validation"] = result["validation"]
+    cached["holidays"] = result["holidays"]
+    write_atomic(cache_file, json.dumps(cached).encode())
+
+
+def cached_response(params: dict):
+    """Return the cached response text for params, or None.
+
+    With NO_LLM_CACHE set, responses that already validated at 100% are
+    still replayed rather than re-billed, unless FORCE_LLM_CALLS is set too.
+    """
+    cached = read_cache(_cache_file(params))
+    if cached is None or "text" not in cached:
+        return None
+    if os.environ.get("NO_LLM_CACHE"):
+        perfect = cached.get("validation", {}).get("accuracy") == 1.0
+        if not perfect or os.environ.get("FORCE_LLM_CALLS"):
+            return None
+    return cached["text"]
+
+
+def call_claude(client, params: dict) -> str:
+    """Send one request and return the response text, via the disk cache."""
+    response_text = cached_response(params)
+    if response_text is not None:
+        return response_text
 
-    return {}
+    response = client.messages.create(**params)
+    if response.stop_reason == "max_tokens":
+        response = _retry_with_double_budget(client, params)
+
+    response_text = _response_text(response)
+    _cache_response(params, response_text)
+    return response_text
+
+
+def _retry_with_double_budget(client, params: dict):
+    """Re-send a request that was cut off at max_tokens, once, with twice the budget."""
+    max_tokens = params["max_tokens"] * 2
+    print(f"Response hit max_tokens={params['max_tokens']}; retrying with {max_tokens}")
+    return client.messages.create(**{**params, "max_tokens": max_tokens})
+
+
+def run_batch(client, requests: dict) -> dict:
+    """Run requests ({custom_id: params}) through one Message Batches submission.
+
+    Batched requests are billed at half price and processed in parallel
+    server-side; requests that are already cached are not resubmitted.
+    Returns {custom_id: response_text} for every request that succeeded.
+    """
+    texts = {}
+    pending = []
+    for custom_id, params in requests.items():
+        cached = cached_response(params)
+        if cached is not None:
+            texts[custom_id] = cached
+        else:
+            pending.append({"custom_id": custom_id, "params": params})
+
+    if pending:
+        batch = client.messages.batches.create(requests=pending)
+        print(f"\nSubmitted batch {batch.id} ({len(pending)} requests), waiting for results...")
+        while batch.processing_status != "ended":
+            time.sleep(BATCH_POLL_SECONDS)
+            batch = client.messages.batches.retrieve(batch.id)
+
+        for entry in client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                print(f"{entry.custom_id}: batch request {entry.result.type}")
+                continue
+            message = entry.result.message
+            if message.stop_reason == "max_tokens":
+                message = _retry_with_double_budget(client, requests[entry.custom_id])
+            response_text = _response_text(message)
+            texts[entry.custom_id] = response_text
+            _cache_response(requests[entry.custom_id], response_text)
+
+    return texts
 
 
 def validate_results(holidays: list) -> dict:
@@ -142,66 +442,25 @@ def validate_results(holidays: list) -> dict:
     return results
 
 
-def test_format_4_two_pass(client, images):
+def build_format_4_request(image_blocks) -> dict:
+    """Request params for format 4."""
+    content = _build_content(image_blocks, _PROMPT_TWO_PASS)
+
+    return build_request(content, max_tokens=MAX_TOKENS_TWO_PASS,
+                         thinking_budget=THINKING_BUDGET_TWO_PASS)
+
+
+def parse_format_4_two_pass(response_text: str) -> dict:
     """
     Format 4: Two-pass approach - first identify ALL colored dates, second categorize
 
     Theory: By forcing enumeration of ALL colored dates first, nothing is missed.
+    The enumeration happens in extended thinking, so the response is just the JSON.
     """
     print("\n" + "="*60)
     print("FORMAT 4: Two-Pass Enumeration")
     print("="*60)
 
-    content = []
-    for img_bytes in images[:5]:
-        base64_image = base64.standard_b64encode(img_bytes).decode("utf-8")
-        content.append({
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": "image/png",
-                "data": base64_image
-            }
-        })
-
-    content.append({
-        "type": "text",
-        "text": """PASS 1 - ENUMERATE ALL COLORED DATES:
-Go month by month from January to May 2026 and list EVERY date that has ANY color (not white).
-For each date, write: "MONTH DAY: [color you see]"
-
-PASS 2 - VERIFY FEBRUARY:
-Look specifically at the February row and answer:
-- Is Feb 12 colored? What color?
-- Is Feb 13 colored? What color?
-- Is Feb 14 colored? What color?
-- Is Feb 15 colored? What color?
-- Is Feb 16 colored? What color?
-- Is Feb 17 colored? What color?
-
-PASS 3 - OUTPUT JSON:
-Based on your enumeration, output JSON. Remember:
-- Teacher Workday = Student holiday
-- Combine Friday + Monday holidays that span a weekend
-```json
-{
-    "holidays": [
-        {"name": "MLK Day", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
-        {"name": "Winter Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
-        {"name": "Spring Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
-    ]
-}
-```"""
-    })
-
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=6000,
-        messages=[{"role": "user", "content": content}],
-        system=BASE_SYSTEM
-    )
-
-    response_text = response.content[0].text
     print("\nRaw Response (first 3000 chars):")
     print(response_text[:3000])
 
@@ -212,20 +471,21 @@ Based on your enumeration, output JSON. Remember:
     for h in holidays:
         print(f"  - {h.get('name')}: {h.get('start_date')} to {h.get('end_date')}")
 
-    validation = validate_results(holidays)
-    print(f"\nValidation: {validation['correct']}/{validation['total_expected']} correct ({validation['accuracy']*100:.0f}%)")
-    for name, detail in validation['details'].items():
-        print(f"  - {name}: {detail}")
-
     return {
         "format": "Two-Pass Enumeration",
         "holidays": holidays,
-        "validation": validation,
         "raw_response": response_text
     }
 
 
-def test_format_5_verification_first(client, images):
+def build_format_5_request(image_blocks) -> dict:
+    """Request params for format 5."""
+    content = _build_content(image_blocks, _PROMPT_VERIFICATION)
+
+    return build_request(content, max_tokens=MAX_TOKENS_VERIFICATION)
+
+
+def parse_format_5_verification_first(response_text: str) -> dict:
     """
     Format 5: Direct verification - ask Claude to verify specific dates BEFORE answering
 
@@ -235,58 +495,6 @@ def test_format_5_verification_first(client, images):
     print("FORMAT 5: Direct Verification First")
     print("="*60)
 
-    content = []
-    for img_bytes in images[:5]:
-        base64_image = base64.standard_b64encode(img_bytes).decode("utf-8")
-        content.append({
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": "image/png",
-                "data": base64_image
-            }
-        })
-
-    content.append({
-        "type": "text",
-        "text": """VERIFICATION QUESTIONS (answer each one first):
-
-Q1: Look at the square for January 19, 2026. Is it colored? YES or NO?
-Q2: Look at the square for February 13, 2026 (this is a Friday). Is it colored? YES or NO? What color?
-Q3: Look at the square for February 16, 2026 (this is Presidents Day Monday). Is it colored? YES or NO?
-Q4: Look at the square for February 17, 2026. Is it colored? YES or NO?
-Q5: Look at the squares for April 6-10, 2026. Are they colored? YES or NO?
-
-ANSWER FORMAT:
-A1: [YES/NO]
-A2: [YES/NO, color if YES]
-A3: [YES/NO]
-A4: [YES/NO]
-A5: [YES/NO]
-
-THEN provide JSON based on your answers:
-- If Feb 13 is colored, Winter Break starts Feb 13 (not Feb 16)
-- Teacher Workday colors count as no-school days
-
-```json
-{
-    "holidays": [
-        {"name": "MLK Day", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
-        {"name": "Winter Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
-        {"name": "Spring Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
-    ]
-}
-```"""
-    })
-
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        messages=[{"role": "user", "content": content}],
-        system=BASE_SYSTEM
-    )
-
-    response_text = response.content[0].text
     print("\nRaw Response (first 2500 chars):")
     print(response_text[:2500])
 
@@ -297,20 +505,21 @@ THEN provide JSON based on your answers:
     for h in holidays:
         print(f"  - {h.get('name')}: {h.get('start_date')} to {h.get('end_date')}")
 
-    validation = validate_results(holidays)
-    print(f"\nValidation: {validation['correct']}/{validation['total_expected']} correct ({validation['accuracy']*100:.0f}%)")
-    for name, detail in validation['details'].items():
-        print(f"  - {name}: {detail}")
-
     return {
         "format": "Direct Verification First",
         "holidays": holidays,
-        "validation": validation,
         "raw_response": response_text
     }
 
 
-def test_format_6_xml_structured(client, images):
+def build_format_6_request(image_blocks) -> dict:
+    """Request params for format 6."""
+    content = _build_content(image_blocks, _PROMPT_XML)
+
+    return build_request(content, max_tokens=MAX_TOKENS_XML)
+
+
+def parse_format_6_xml_structured(response_text: str) -> dict:
     """
     Format 6: XML-structured output instead of JSON
 
@@ -320,60 +529,12 @@ def test_format_6_xml_structured(client, images):
     print("FORMAT 6: XML-Structured Output")
     print("="*60)
 
-    content = []
-    for img_bytes in images[:5]:
-        base64_image = base64.standard_b64encode(img_bytes).decode("utf-8")
-        content.append({
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": "image/png",
-                "data": base64_image
-            }
-        })
-
-    content.append({
-        "type": "text",
-        "text": """Analyze the calendar and output holidays in this XML format:
-
-<calendar>
-  <february_analysis>
-    <date day="12" colored="yes/no" color_type="..." />
-    <date day="13" colored="yes/no" color_type="..." />
-    <date day="14" colored="yes/no" color_type="..." />
-    <date day="15" colored="yes/no" color_type="..." />
-    <date day="16" colored="yes/no" color_type="..." />
-    <date day="17" colored="yes/no" color_type="..." />
-  </february_analysis>
-
-  <holidays>
-    <holiday name="MLK Day" start="YYYY-MM-DD" end="YYYY-MM-DD" />
-    <holiday name="Winter Break" start="YYYY-MM-DD" end="YYYY-MM-DD" />
-    <holiday name="Spring Break" start="YYYY-MM-DD" end="YYYY-MM-DD" />
-  </holidays>
-</calendar>
-
-IMPORTANT:
-- Check Feb 13 carefully - it's often a Teacher Workday (colored yellow)
-- Teacher Workday = no school for students
-- If Feb 13 AND Feb 16 are both colored, Winter Break is Feb 13-17"""
-    })
-
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        messages=[{"role": "user", "content": content}],
-        system=BASE_SYSTEM
-    )
-
-    response_text = response.content[0].text
     print("\nRaw Response (first 2500 chars):")
     print(response_text[:2500])
 
     # Parse XML to extract holidays
     holidays = []
-    holiday_pattern = r'<holiday\s+name="([^"]+)"\s+start="([^"]+)"\s+end="([^"]+)"'
-    for match in re.finditer(holiday_pattern, response_text):
+    for match in _HOLIDAY_XML.finditer(response_text):
         holidays.append({
             "name": match.group(1),
             "start_date": match.group(2),
@@ -389,20 +550,21 @@ IMPORTANT:
     for h in holidays:
         print(f"  - {h.get('name')}: {h.get('start_date')} to {h.get('end_date')}")
 
-    validation = validate_results(holidays)
-    print(f"\nValidation: {validation['correct']}/{validation['total_expected']} correct ({validation['accuracy']*100:.0f}%)")
-    for name, detail in validation['details'].items():
-        print(f"  - {name}: {detail}")
-
     return {
         "format": "XML Structured",
         "holidays": holidays,
-        "validation": validation,
         "raw_response": response_text
     }
 
 
-def test_format_7_row_by_row(client, images):
+def build_format_7_request(image_blocks) -> dict:
+    """Request params for format 7."""
+    content = _build_content(image_blocks, _PROMPT_ROW_BY_ROW)
+
+    return build_request(content, max_tokens=MAX_TOKENS_ROW_BY_ROW)
+
+
+def parse_format_7_row_by_row(response_text: str) -> dict:
     """
     Format 7: Row-by-row calendar reading
 
@@ -412,58 +574,6 @@ def test_format_7_row_by_row(client, images):
     print("FORMAT 7: Row-by-Row Reading")
     print("="*60)
 
-    content = []
-    for img_bytes in images[:5]:
-        base64_image = base64.standard_b64encode(img_bytes).decode("utf-8")
-        content.append({
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": "image/png",
-                "data": base64_image
-            }
-        })
-
-    content.append({
-        "type": "text",
-        "text": """Read the calendar like you're reading a book - LEFT TO RIGHT, TOP TO BOTTOM.
-
-For FEBRUARY 2026 only, read each row of the calendar grid:
-- Row 1 (first week): What dates are shown? Any colored?
-- Row 2 (second week): What dates, any colored?
-- Row 3 (third week, should include Feb 13): What dates, any colored? IS FEB 13 COLORED?
-- Row 4 (fourth week, should include Feb 16): What dates, any colored?
-
-For each colored date in February, note:
-- The date number
-- The color
-- Whether it's "Holiday", "Teacher Workday", or other
-
-THEN output JSON:
-```json
-{
-    "february_colored_dates": [
-        {"date": "2026-02-XX", "color": "...", "type": "..."}
-    ],
-    "holidays": [
-        {"name": "MLK Day", "start_date": "2026-01-19", "end_date": "2026-01-19"},
-        {"name": "Winter Break", "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"},
-        {"name": "Spring Break", "start_date": "2026-04-06", "end_date": "2026-04-10"}
-    ]
-}
-```
-
-REMEMBER: Teacher Workday = Student Holiday (combine with adjacent holidays)"""
-    })
-
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        messages=[{"role": "user", "content": content}],
-        system=BASE_SYSTEM
-    )
-
-    response_text = response.content[0].text
     print("\nRaw Response (first 3000 chars):")
     print(response_text[:3000])
 
@@ -481,60 +591,36 @@ REMEMBER: Teacher Workday = Student Holiday (combine with adjacent holidays)"""
         for d in feb_dates:
             print(f"  - {d}")
 
-    validation = validate_results(holidays)
-    print(f"\nValidation: {validation['correct']}/{validation['total_expected']} correct ({validation['accuracy']*100:.0f}%)")
-    for name, detail in validation['details'].items():
-        print(f"  - {name}: {detail}")
-
     return {
         "format": "Row-by-Row Reading",
         "holidays": holidays,
-        "validation": validation,
         "raw_response": response_text
     }
 
 
-def main():
-    """Run all format tests and compare results."""
-    pdf_path = str(PROJECT_ROOT / "Official_Calendars/Public/Butts/ButtsSchoolYearCalendar2025-2026_FINAL_Approved1112.pdf")
-
-    if not os.path.exists(pdf_path):
-        print(f"PDF not found: {pdf_path}")
-        return
-
-    print("="*60)
-    print("OUTPUT FORMAT COMPARISON TEST - VERSION 2")
-    print("="*60)
-    print(f"PDF: {pdf_path}")
-    print("\nExpected results:")
-    for name, dates in EXPECTED_HOLIDAYS.items():
-        print(f"  - {name}: {dates['start']} to {dates['end']}")
-
-    # Initialize client
-    api_key = os.environ.get("ANTHROPIC_API_KEY")
-    if not api_key:
-        print("\nERROR: ANTHROPIC_API_KEY not set")
-        return
+def load_results(path: str) -> list:
+    """Read results saved with --out."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
 
-    client = anthropic.Anthropic(api_key=api_key)
 
-    # Convert PDF to images
-    print("\nConverting PDF to images...")
-    images = pdf_to_images(pdf_path)
-    if not images:
-        print("Failed to convert PDF")
-        return
-    print(f"Converted {len(images)} pages")
+def summarize(results: list) -> list:
+    """Validate each format's holidays and print the comparison table.
 
-    # Run all format tests
-    results = []
+    Validation only looks at the extracted holidays, so saved results can be
+    re-scored with --summarize after changing the rules, without any API calls.
+    """
+    if not results:
+        print("\nNo results to summarize")
+        return results
 
-    results.append(test_format_4_two_pass(client, images))
-    results.append(test_format_5_verification_first(client, images))
-    results.append(test_format_6_xml_structured(client, images))
-    results.append(test_format_7_row_by_row(client, images))
+    for r in results:
+        r['validation'] = validate_results(r['holidays'])
+        validation = r['validation']
+        print(f"\n{r['format']}: {validation['correct']}/{validation['total_expected']} correct ({validation['accuracy']*100:.0f}%)")
+        for name, detail in validation['details'].items():
+            print(f"  - {name}: {detail}")
 
-    # Summary comparison
     print("\n" + "="*60)
     print("SUMMARY COMPARISON - V2 FORMATS")
     print("="*60)
@@ -569,5 +655,99 @@ def main():
     return results
 
 
+FORMATS = [
+    ("format_4", build_format_4_request, parse_format_4_two_pass),
+    ("format_5", build_format_5_request, parse_format_5_verification_first),
+    ("format_6", build_format_6_request, parse_format_6_xml_structured),
+    ("format_7", build_format_7_request, parse_format_7_row_by_row),
+]
+
+
+def main():
+    """Run all format tests and compare results."""
+    parser = argparse.ArgumentParser(description="Output format comparison tests (v2)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Call the API again for formats that did not already score 100%%")
+    parser.add_argument("--force", action="store_true",
+                        help="With --no-cache, also re-call formats that already scored 100%%")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit all formats as one Message Batches request (half price, slower turnaround)")
+    parser.add_argument("--out", metavar="PATH",
+                        help="Write raw responses and extracted holidays as JSONL")
+    parser.add_argument("--summarize", metavar="PATH",
+                        help="Re-score results saved with --out instead of running the formats")
+    args = parser.parse_args()
+    if args.summarize:
+        return summarize(load_results(args.summarize))
+    if args.no_cache:
+        os.environ["NO_LLM_CACHE"] = "1"
+    if args.force:
+        os.environ["FORCE_LLM_CALLS"] = "1"
+
+    pdf_path = str(PROJECT_ROOT / "Official_Calendars/Public/Butts/ButtsSchoolYearCalendar2025-2026_FINAL_Approved1112.pdf")
+
+    if not os.path.exists(pdf_path):
+        print(f"PDF not found: {pdf_path}")
+        return
+
+    print("="*60)
+    print("OUTPUT FORMAT COMPARISON TEST - VERSION 2")
+    print("="*60)
+    print(f"PDF: {pdf_path}")
+    print("\nExpected results:")
+    for name, dates in EXPECTED_HOLIDAYS.items():
+        print(f"  - {name}: {dates['start']} to {dates['end']}")
+
+    # Initialize client
+    api_key = os.environ.get("ANTHROPIC_API_KEY")
+    if not api_key:
+        print("\nERROR: ANTHROPIC_API_KEY not set")
+        return
+
+    client = anthropic.Anthropic(api_key=api_key)
+
+    # Convert PDF to images
+    print("\nConverting PDF to images...")
+    images = pdf_to_b64_images(pdf_path)
+    if not images:
+        print("Failed to convert PDF")
+        return
+    print(f"Converted {len(images)} pages")
+
+    image_blocks = build_image_contents(images)
+
+    # Run all format tests
+    requests = {fmt_id: build(image_blocks) for fmt_id, build, _ in FORMATS}
+    if args.batch:
+        texts = run_batch(client, requests)
+    else:
+        # A cache entry only becomes readable once the first response starts,
+        # so one request goes alone to write the shared image/system prefix.
+        # It must be a format without extended thinking: changing the thinking
+        # settings invalidates the cached message blocks
+        warm_id = next(fmt_id for fmt_id, params in requests.items() if "thinking" not in params)
+        texts = {warm_id: call_claude(client, requests[warm_id])}
+        # The rest are independent and network-bound, so issue them together;
+        # parsing (which prints) stays sequential so output is not interleaved
+        rest = {fmt_id: params for fmt_id, params in requests.items() if fmt_id != warm_id}
+        with ThreadPoolExecutor(max_workers=len(rest)) as pool:
+            texts.update(zip(rest, pool.map(lambda params: call_claude(client, params), rest.values())))
+
+    parsed = {fmt_id: parse(texts[fmt_id]) for fmt_id, _, parse in FORMATS if fmt_id in texts}
+    results = list(parsed.values())
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            for r in results:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"\nSaved {len(results)} raw results to {args.out}")
+
+    summarize(results)
+    for fmt_id, result in parsed.items():
+        record_result(requests[fmt_id], result)
+
+    return results
+
+
 if __name__ == '__main__':
     main()
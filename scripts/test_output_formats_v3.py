@@ -16,7 +16,8 @@ import os
 import sys
 import json
 import base64
-import re
+import hashlib
+import io
 from datetime import datetime, date
 from pathlib import Path
 
@@ -33,7 +34,18 @@ try:
 except ImportError:
     pass
 
+from scripts.llm_test_utils import extract_json_from_response, run_concurrently, write_atomic
+
 import anthropic
+import httpx
+
+# Longest image edge Claude accepts without resizing server-side
+MAX_IMAGE_EDGE = 1568
+
+# Rendered pages keyed by a hash of the PDF bytes and render settings, so
+# re-runs over the same calendar skip rendering entirely
+PDF_PAGE_CACHE_DIR = PROJECT_ROOT / ".cache" / "pdf_pages"
+
 
 # Expected results for validation
 EXPECTED_HOLIDAYS = {
@@ -43,53 +55,76 @@ EXPECTED_HOLIDAYS = {
 }
 
 
-def pdf_to_images(pdf_path: str):
-    """Convert PDF pages to images."""
+def pdf_to_images(pdf_path: str, max_pages: int = None):
+    """Yield PDF pages as JPEG bytes, rendering each only when it is consumed."""
     try:
-        from pdf2image import convert_from_path
-        import io
+        pdf_bytes = Path(pdf_path).read_bytes()
+        key = hashlib.sha256(
+            pdf_bytes + f"dpi=200;max_edge={MAX_IMAGE_EDGE};fmt=jpeg;pages={max_pages}".encode()
+        ).hexdigest()
+        cache_dir = PDF_PAGE_CACHE_DIR / key
+        manifest = cache_dir / 'manifest.json'
+
+        # The manifest is written last, so its presence means every page is there
+        if manifest.exists():
+            n_pages = json.loads(manifest.read_text())['pages']
+            for i in range(n_pages):
+                yield (cache_dir / f"page_{i}.jpg").read_bytes()
+            return
+
+        import pypdfium2 as pdfium
+        from PIL import Image
+
+        pdf = pdfium.PdfDocument(pdf_path)
+    except Exception as e:
+        print(f"Error converting PDF: {e}")
+        return
 
-        images = convert_from_path(pdf_path, dpi=200, poppler_path='/opt/homebrew/bin')
-        image_bytes_list = []
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        n_pages = len(pdf) if max_pages is None else min(len(pdf), max_pages)
+        for i in range(n_pages):
+            page = pdf[i]
+            try:
+                img = page.render(scale=200 / 72).to_pil()
+            finally:
+                page.close()
+            # Claude downscales anything larger server-side; do it here instead
+            img.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
 
-        for img in images:
             buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            image_bytes_list.append(buffer.getvalue())
-
-        return image_bytes_list
+            # JPEG is several times smaller and faster to encode than PNG; no
+            # chroma subsampling, so thin coloured day cells keep their colour
+            img.save(buffer, format='JPEG', quality=85, subsampling=0)
+            write_atomic(cache_dir / f"page_{i}.jpg", buffer.getvalue())
+            yield buffer.getvalue()
+        write_atomic(manifest, json.dumps({'pages': n_pages}).encode())
     except Exception as e:
         print(f"Error converting PDF: {e}")
-        return []
-
-
-def extract_json_from_response(response_text: str) -> dict:
-    """Extract JSON from response text."""
-    json_match = re.search(r'```(?:json)?\s*(.*?)```', response_text, re.DOTALL)
-    if json_match:
-        try:
-            return json.loads(json_match.group(1).strip())
-        except:
-            pass
-
-    start = response_text.find('{')
-    if start != -1:
-        depth = 0
-        end = start
-        for i, c in enumerate(response_text[start:], start):
-            if c == '{':
-                depth += 1
-            elif c == '}':
-                depth -= 1
-                if depth == 0:
-                    end = i + 1
-                    break
-        try:
-            return json.loads(response_text[start:end])
-        except:
-            pass
-
-    return {}
+    finally:
+        pdf.close()
+
+
+def build_image_contents(images: list) -> list:
+    """Base64-encode page images once into reusable message content blocks.
+
+    The last block is marked for prompt caching, so a rerun of a format
+    within the cache TTL reads its system prompt + images prefix from cache.
+    """
+    blocks = [
+        {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": "image/jpeg",
+                "data": base64.standard_b64encode(img_bytes).decode("ascii")
+            }
+        }
+        for img_bytes in images
+    ]
+    if blocks:
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
 
 
 def validate_results(holidays: list) -> dict:
@@ -102,27 +137,24 @@ def validate_results(holidays: list) -> dict:
         "details": {}
     }
 
-    extracted_by_name = {}
-    for h in holidays:
-        name = h.get('name', '')
-        extracted_by_name[name] = h
+    extracted_by_name = {h.get('name', ''): h for h in holidays}
 
     for name, expected in EXPECTED_HOLIDAYS.items():
         if name in extracted_by_name:
             h = extracted_by_name[name]
-            start_match = h.get('start_date') == expected['start']
-            end_match = h.get('end_date') == expected['end']
+            start = h.get('start_date')
+            end = h.get('end_date')
 
-            if start_match and end_match:
+            if start == expected['start'] and end == expected['end']:
                 results['correct'] += 1
                 results['details'][name] = "CORRECT"
             else:
                 results['wrong_dates'].append({
                     "name": name,
                     "expected": expected,
-                    "got": {"start": h.get('start_date'), "end": h.get('end_date')}
+                    "got": {"start": start, "end": end}
                 })
-                results['details'][name] = f"WRONG - Expected {expected['start']} to {expected['end']}, got {h.get('start_date')} to {h.get('end_date')}"
+                results['details'][name] = f"WRONG - Expected {expected['start']} to {expected['end']}, got {start} to {end}"
         else:
             results['missing'].append(name)
             results['details'][name] = "MISSING"
@@ -131,32 +163,8 @@ def validate_results(holidays: list) -> dict:
     return results
 
 
-def test_format_8_color_first(client, images):
-    """
-    Format 8: Color-first approach - describe colors before inferring meaning
-
-    Theory: By asking Claude to describe WHAT IT SEES first without interpretation,
-    it won't skip dates due to cognitive shortcuts.
-    """
-    print("\n" + "="*60)
-    print("FORMAT 8: Color-First (Describe Before Interpret)")
-    print("="*60)
-
-    content = []
-    for img_bytes in images[:5]:
-        base64_image = base64.standard_b64encode(img_bytes).decode("utf-8")
-        content.append({
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": "image/png",
-                "data": base64_image
-            }
-        })
-
-    content.append({
-        "type": "text",
-        "text": """TASK: Describe the VISUAL APPEARANCE of each date cell in February 2026.
+# Format 8: describe every February cell's color before interpreting it
+_PROMPT_COLOR_FIRST = """TASK: Describe the VISUAL APPEARANCE of each date cell in February 2026.
 
 DO NOT interpret what the colors mean yet. Just describe what you SEE.
 
@@ -180,78 +188,9 @@ Finally, output Winter Break dates as JSON:
 ```
 
 Remember: If a date has ANY non-white background, students don't have school that day."""
-    })
-
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        messages=[{"role": "user", "content": content}],
-        system="You are a careful visual analyst. Describe exactly what you see before making interpretations."
-    )
-
-    response_text = response.content[0].text
-    print("\nRaw Response (first 3000 chars):")
-    print(response_text[:3000])
-
-    # Extract just Winter Break for this test
-    result = extract_json_from_response(response_text)
-
-    # Build holidays list
-    holidays = []
-    if 'name' in result and result.get('name') == 'Winter Break':
-        holidays.append(result)
-    elif 'holidays' in result:
-        holidays = result.get('holidays', [])
 
-    # Add MLK Day and Spring Break with expected values for comparison
-    # (This test focuses on Winter Break accuracy)
-    if not any(h.get('name') == 'MLK Day' for h in holidays):
-        holidays.append({"name": "MLK Day", "start_date": "2026-01-19", "end_date": "2026-01-19"})
-    if not any(h.get('name') == 'Spring Break' for h in holidays):
-        holidays.append({"name": "Spring Break", "start_date": "2026-04-06", "end_date": "2026-04-10"})
-
-    print(f"\nExtracted holidays:")
-    for h in holidays:
-        print(f"  - {h.get('name')}: {h.get('start_date')} to {h.get('end_date')}")
-
-    validation = validate_results(holidays)
-    print(f"\nValidation: {validation['correct']}/{validation['total_expected']} correct ({validation['accuracy']*100:.0f}%)")
-    for name, detail in validation['details'].items():
-        print(f"  - {name}: {detail}")
-
-    return {
-        "format": "Color-First Description",
-        "holidays": holidays,
-        "validation": validation,
-        "raw_response": response_text
-    }
-
-
-def test_format_9_negative_verification(client, images):
-    """
-    Format 9: Negative verification - ask which dates are NOT colored
-
-    Theory: Asking which dates DON'T have color may force more careful scanning.
-    """
-    print("\n" + "="*60)
-    print("FORMAT 9: Negative Verification (Which are NOT colored)")
-    print("="*60)
-
-    content = []
-    for img_bytes in images[:5]:
-        base64_image = base64.standard_b64encode(img_bytes).decode("utf-8")
-        content.append({
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": "image/png",
-                "data": base64_image
-            }
-        })
-
-    content.append({
-        "type": "text",
-        "text": """For February 2026 in this calendar, I need you to identify which weekdays (Mon-Fri) are REGULAR SCHOOL DAYS (white/uncolored background).
+# Format 9: list the uncolored (school) days as well as the colored ones
+_PROMPT_NEGATIVE = """For February 2026 in this calendar, I need you to identify which weekdays (Mon-Fri) are REGULAR SCHOOL DAYS (white/uncolored background).
 
 List all February 2026 weekdays that have a WHITE/UNCOLORED background:
 (These are days when students DO have school)
@@ -276,75 +215,9 @@ Output as JSON:
     ]
 }
 ```"""
-    })
-
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        messages=[{"role": "user", "content": content}],
-        system="You are a meticulous visual analyst. Check every single cell carefully."
-    )
-
-    response_text = response.content[0].text
-    print("\nRaw Response (first 3000 chars):")
-    print(response_text[:3000])
-
-    result = extract_json_from_response(response_text)
-    holidays = result.get('holidays', [])
-
-    # Add MLK Day and Spring Break with expected values
-    if not any(h.get('name') == 'MLK Day' for h in holidays):
-        holidays.append({"name": "MLK Day", "start_date": "2026-01-19", "end_date": "2026-01-19"})
-    if not any(h.get('name') == 'Spring Break' for h in holidays):
-        holidays.append({"name": "Spring Break", "start_date": "2026-04-06", "end_date": "2026-04-10"})
-
-    print(f"\nExtracted holidays:")
-    for h in holidays:
-        print(f"  - {h.get('name')}: {h.get('start_date')} to {h.get('end_date')}")
-
-    # Show the no-school days found
-    no_school = result.get('february_no_school_days', [])
-    if no_school:
-        print(f"\nFebruary no-school days identified: {no_school}")
-
-    validation = validate_results(holidays)
-    print(f"\nValidation: {validation['correct']}/{validation['total_expected']} correct ({validation['accuracy']*100:.0f}%)")
-    for name, detail in validation['details'].items():
-        print(f"  - {name}: {detail}")
-
-    return {
-        "format": "Negative Verification",
-        "holidays": holidays,
-        "validation": validation,
-        "raw_response": response_text
-    }
-
-
-def test_format_10_explicit_cell_check(client, images):
-    """
-    Format 10: Explicit cell-by-cell check with forced answers
-
-    Theory: Force Claude to answer YES/NO for specific cells, no skipping allowed.
-    """
-    print("\n" + "="*60)
-    print("FORMAT 10: Explicit Cell Check (Forced YES/NO)")
-    print("="*60)
-
-    content = []
-    for img_bytes in images[:5]:
-        base64_image = base64.standard_b64encode(img_bytes).decode("utf-8")
-        content.append({
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": "image/png",
-                "data": base64_image
-            }
-        })
 
-    content.append({
-        "type": "text",
-        "text": """MANDATORY CELL CHECK - You MUST answer each question below.
+# Format 10: forced YES/NO answer for every cell around Presidents Day
+_PROMPT_CELL_CHECK = """MANDATORY CELL CHECK - You MUST answer each question below.
 
 Look at the February 2026 section of the calendar. For each date listed below, answer whether the cell has a COLORED background (yellow, blue, gray - anything other than white).
 
@@ -388,77 +261,9 @@ Based on your answers above, what is the date range for Winter Break?
     ]
 }
 ```"""
-    })
-
-    response = client.messages.create(
-        model="claude-sonnet-4-20250514",
-        max_tokens=4096,
-        messages=[{"role": "user", "content": content}],
-        system="You must answer every question. Do not skip any cells. Look carefully at each date cell."
-    )
-
-    response_text = response.content[0].text
-    print("\nRaw Response (first 3500 chars):")
-    print(response_text[:3500])
-
-    result = extract_json_from_response(response_text)
-    holidays = result.get('holidays', [])
-
-    # Show cell checks
-    cell_checks = result.get('cell_checks', {})
-    if cell_checks:
-        print("\nCell check results:")
-        for date, status in sorted(cell_checks.items()):
-            print(f"  {date}: {status}")
-
-    # Add MLK Day and Spring Break with expected values
-    if not any(h.get('name') == 'MLK Day' for h in holidays):
-        holidays.append({"name": "MLK Day", "start_date": "2026-01-19", "end_date": "2026-01-19"})
-    if not any(h.get('name') == 'Spring Break' for h in holidays):
-        holidays.append({"name": "Spring Break", "start_date": "2026-04-06", "end_date": "2026-04-10"})
-
-    print(f"\nExtracted holidays:")
-    for h in holidays:
-        print(f"  - {h.get('name')}: {h.get('start_date')} to {h.get('end_date')}")
-
-    validation = validate_results(holidays)
-    print(f"\nValidation: {validation['correct']}/{validation['total_expected']} correct ({validation['accuracy']*100:.0f}%)")
-    for name, detail in validation['details'].items():
-        print(f"  - {name}: {detail}")
-
-    return {
-        "format": "Explicit Cell Check",
-        "holidays": holidays,
-        "validation": validation,
-        "raw_response": response_text
-    }
-
-
-def test_format_11_known_fact_injection(client, images):
-    """
-    Format 11: Inject known facts to see if Claude agrees
-
-    Theory: Tell Claude what we expect and ask it to verify/correct.
-    """
-    print("\n" + "="*60)
-    print("FORMAT 11: Known Fact Verification")
-    print("="*60)
-
-    content = []
-    for img_bytes in images[:5]:
-        base64_image = base64.standard_b64encode(img_bytes).decode("utf-8")
-        content.append({
-            "type": "image",
-            "source": {
-                "type": "base64",
-                "media_type": "image/png",
-                "data": base64_image
-            }
-        })
 
-    content.append({
-        "type": "text",
-        "text": """I have a claim about this calendar that I need you to VERIFY by looking at the image.
+# Format 11: state the expected answer and ask Claude to verify it
+_PROMPT_KNOWN_FACT = """I have a claim about this calendar that I need you to VERIFY by looking at the image.
 
 CLAIM: "Winter Break for Butts County 2025-2026 runs from February 13 to February 17, 2026.
 This includes:
@@ -492,33 +297,70 @@ If incorrect, what are the actual dates?
     ]
 }
 ```"""
-    })
+
+
+def _report_no_school_days(result: dict):
+    no_school = result.get('february_no_school_days', [])
+    if no_school:
+        print(f"\nFebruary no-school days identified: {no_school}")
+
+
+def _report_cell_checks(result: dict):
+    cell_checks = result.get('cell_checks', {})
+    if cell_checks:
+        print("\nCell check results:")
+        for date, status in sorted(cell_checks.items()):
+            print(f"  {date}: {status}")
+
+
+def _report_verification(result: dict):
+    verification = result.get('verification', {})
+    if verification:
+        print("\nVerification results:")
+        for key, value in verification.items():
+            print(f"  {key}: {value}")
+
+
+def _run_format(client, image_blocks, *, title: str, label: str, system: str,
+                prompt: str, preview_chars: int = 3000, report_extra=None) -> dict:
+    """Send one format's prompt with the shared page images and validate the answer.
+
+    Only Winter Break is under test, so MLK Day and Spring Break are filled
+    in with their expected values when the response leaves them out.
+    """
+    print("\n" + "="*60)
+    print(title)
+    print("="*60)
+
+    content = list(image_blocks)
+    content.append({"type": "text", "text": prompt})
 
     response = client.messages.create(
         model="claude-sonnet-4-20250514",
         max_tokens=4096,
         messages=[{"role": "user", "content": content}],
-        system="You are fact-checking claims against visual evidence. Be precise and accurate."
+        system=system
     )
 
     response_text = response.content[0].text
-    print("\nRaw Response (first 3000 chars):")
-    print(response_text[:3000])
+    print(f"\nRaw Response (first {preview_chars} chars):")
+    print(response_text[:preview_chars])
 
     result = extract_json_from_response(response_text)
-    holidays = result.get('holidays', [])
 
-    # Show verification results
-    verification = result.get('verification', {})
-    if verification:
-        print("\nVerification results:")
-        for key, value in verification.items():
-            print(f"  {key}: {value}")
+    # Format 8 answers with a bare Winter Break object instead of a list
+    if result.get('name') == 'Winter Break':
+        holidays = [result]
+    else:
+        holidays = result.get('holidays', [])
+
+    if report_extra:
+        report_extra(result)
 
-    # Add MLK Day and Spring Break with expected values
-    if not any(h.get('name') == 'MLK Day' for h in holidays):
+    names = {h.get('name') for h in holidays}
+    if 'MLK Day' not in names:
         holidays.append({"name": "MLK Day", "start_date": "2026-01-19", "end_date": "2026-01-19"})
-    if not any(h.get('name') == 'Spring Break' for h in holidays):
+    if 'Spring Break' not in names:
         holidays.append({"name": "Spring Break", "start_date": "2026-04-06", "end_date": "2026-04-10"})
 
     print(f"\nExtracted holidays:")
@@ -531,13 +373,78 @@ If incorrect, what are the actual dates?
         print(f"  - {name}: {detail}")
 
     return {
-        "format": "Known Fact Verification",
+        "format": label,
         "holidays": holidays,
         "validation": validation,
         "raw_response": response_text
     }
 
 
+def test_format_8_color_first(client, image_blocks):
+    """
+    Format 8: Color-first approach - describe colors before inferring meaning
+
+    Theory: By asking Claude to describe WHAT IT SEES first without interpretation,
+    it won't skip dates due to cognitive shortcuts.
+    """
+    return _run_format(
+        client, image_blocks,
+        title="FORMAT 8: Color-First (Describe Before Interpret)",
+        label="Color-First Description",
+        system="You are a careful visual analyst. Describe exactly what you see before making interpretations.",
+        prompt=_PROMPT_COLOR_FIRST,
+    )
+
+
+def test_format_9_negative_verification(client, image_blocks):
+    """
+    Format 9: Negative verification - ask which dates are NOT colored
+
+    Theory: Asking which dates DON'T have color may force more careful scanning.
+    """
+    return _run_format(
+        client, image_blocks,
+        title="FORMAT 9: Negative Verification (Which are NOT colored)",
+        label="Negative Verification",
+        system="You are a meticulous visual analyst. Check every single cell carefully.",
+        prompt=_PROMPT_NEGATIVE,
+        report_extra=_report_no_school_days,
+    )
+
+
+def test_format_10_explicit_cell_check(client, image_blocks):
+    """
+    Format 10: Explicit cell-by-cell check with forced answers
+
+    Theory: Force Claude to answer YES/NO for specific cells, no skipping allowed.
+    """
+    return _run_format(
+        client, image_blocks,
+        title="FORMAT 10: Explicit Cell Check (Forced YES/NO)",
+        label="Explicit Cell Check",
+        system="You must answer every question. Do not skip any cells. Look carefully at each date cell.",
+        prompt=_PROMPT_CELL_CHECK,
+        preview_chars=3500,
+        report_extra=_report_cell_checks,
+    )
+
+
+def test_format_11_known_fact_injection(client, image_blocks):
+    """
+    Format 11: Inject known facts to see if Claude agrees
+
+    Theory: Tell Claude what we expect and ask it to verify/correct.
+    """
+    return _run_format(
+        client, image_blocks,
+        title="FORMAT 11: Known Fact Verification",
+        label="Known Fact Verification",
+        system="You are fact-checking claims against visual evidence. Be precise and accurate.",
+        prompt=_PROMPT_KNOWN_FACT,
+        report_extra=_report_verification,
+    )
+
+
 def main():
     """Run all format tests and compare results."""
     pdf_path = str(PROJECT_ROOT / "Official_Calendars/Public/Butts/ButtsSchoolYearCalendar2025-2026_FINAL_Approved1112.pdf")
@@ -561,23 +468,34 @@ def main():
         print("\nERROR: ANTHROPIC_API_KEY not set")
         return
 
-    client = anthropic.Anthropic(api_key=api_key)
+    # One keep-alive pool shared by the concurrent tests, so only the first
+    # request pays the TLS handshake and none of them wait for a connection
+    client = anthropic.Anthropic(
+        api_key=api_key,
+        max_retries=2,
+        http_client=anthropic.DefaultHttpxClient(
+            limits=httpx.Limits(max_connections=8, max_keepalive_connections=8)
+        ),
+    )
 
     # Convert PDF to images
     print("\nConverting PDF to images...")
-    images = pdf_to_images(pdf_path)
+    # Only the first five pages are sent, so the rest are never rendered
+    images = list(pdf_to_images(pdf_path, max_pages=5))
     if not images:
         print("Failed to convert PDF")
         return
     print(f"Converted {len(images)} pages")
 
-    # Run all format tests
-    results = []
+    image_blocks = build_image_contents(images)
 
-    results.append(test_format_8_color_first(client, images))
-    results.append(test_format_9_negative_verification(client, images))
-    results.append(test_format_10_explicit_cell_check(client, images))
-    results.append(test_format_11_known_fact_injection(client, images))
+    # Run all format tests; they only wait on the API, so run them together
+    results = run_concurrently([
+        (test_format_8_color_first, client, image_blocks),
+        (test_format_9_negative_verification, client, image_blocks),
+        (test_format_10_explicit_cell_check, client, image_blocks),
+        (test_format_11_known_fact_injection, client, image_blocks),
+    ])
 
     # Summary comparison
     print("\n" + "="*60)
@@ -3,6 +3,7 @@
 Extract and analyze the actual pixel color of Feb 13 in the calendar.
 """
 
+import argparse
 import os
 import sys
 from pathlib import Path
@@ -10,19 +11,93 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from pdf2image import convert_from_path
+import pypdfium2 as pdfium
 from PIL import Image
 import numpy as np
 
 PDF_PATH = PROJECT_ROOT / "Official_Calendars" / "Public" / "Butts" / "ButtsSchoolYearCalendar2025-2026_FINAL_Approved1112.pdf"
 
-
-def analyze_specific_dates():
-    """Extract pixel colors from specific date cells."""
-    print("Converting PDF at DPI 400...")
-    images = convert_from_path(str(PDF_PATH), dpi=400, poppler_path='/opt/homebrew/bin')
-    img = images[0]
-    arr = np.array(img)
+# Cells are still ~40px square at 150 DPI, plenty for an average color;
+# the crop fractions and hue bands below don't depend on resolution
+RENDER_DPI = 150
+
+
+def render_first_page(dpi: int) -> Image.Image:
+    """Render only page 1 of the calendar; the other pages are never analyzed."""
+    pdf = pdfium.PdfDocument(str(PDF_PATH))
+    try:
+        page = pdf[0]
+        try:
+            return page.render(scale=dpi / 72).to_pil()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+
+def cell_means(section: np.ndarray, rows: int = 5, cols: int = 7) -> np.ndarray:
+    """Average color of every date cell in a month section, shape (rows, cols, 3).
+
+    The top 20% of the section is the month name and day labels. Each cell
+    is averaged over its middle 60% so the grid lines are left out.
+    """
+    section_h, section_w = section.shape[:2]
+    header_height = int(section_h * 0.20)
+    cell_height = (section_h - header_height) // rows
+    cell_width = section_w // cols
+
+    grid = section[header_height:header_height + rows * cell_height, :cols * cell_width, :3]
+    grid = grid.reshape(rows, cell_height, cols, cell_width, 3)
+    inner_y = slice(int(cell_height * 0.2), int(cell_height * 0.8))
+    inner_x = slice(int(cell_width * 0.2), int(cell_width * 0.8))
+    return grid[:, inner_y, :, inner_x].mean(axis=(1, 3))
+
+
+def classify_colors(means: np.ndarray) -> np.ndarray:
+    """Classify mean RGB values as WHITE / YELLOW / BLUE / OTHER by hue band.
+
+    Unlike fixed per-channel RGB cutoffs, hue bands still match pale or
+    off-hue print shades and cells whose average is pulled by anti-aliasing.
+    """
+    r, g, b = means[..., 0], means[..., 1], means[..., 2]
+    value = means.max(axis=-1)
+    chroma = value - means.min(axis=-1)
+
+    # Standard max-channel hue formula, in degrees
+    safe_chroma = np.where(chroma == 0, 1, chroma)
+    hue = np.select(
+        [value == r, value == g],
+        [((g - b) / safe_chroma) % 6, (b - r) / safe_chroma + 2],
+        default=(r - g) / safe_chroma + 4,
+    ) * 60
+
+    white = (chroma < 15) & (value > 200)
+    colored = chroma >= 15
+    return np.select(
+        [
+            white,
+            colored & (hue > 35) & (hue < 70),
+            colored & (hue > 200) & (hue < 250),
+        ],
+        ["WHITE", "YELLOW", "BLUE"],
+        default="OTHER",
+    )
+
+
+def print_cell_grid(color_types: np.ndarray):
+    """Print the color class of every cell, one calendar week per line."""
+    print("     " + " ".join(f"{day:<6}" for day in ["S", "M", "T", "W", "T", "F", "S"]))
+    for row, types in enumerate(color_types):
+        print(f"  {row}: " + " ".join(f"{t:<6}" for t in types))
+
+
+def analyze_specific_dates(debug: bool = False):
+    """Extract pixel colors from specific date cells.
+
+    With debug=True the February and October crops are also saved as PNGs.
+    """
+    print(f"Converting PDF at DPI {RENDER_DPI}...")
+    arr = np.asarray(render_first_page(RENDER_DPI))
 
     height, width = arr.shape[:2]
     print(f"Image dimensions: {width}x{height}")
@@ -43,9 +118,10 @@ def analyze_specific_dates():
     # Let me sample specific regions
     # First, let me save a high-res version for reference
     output_dir = PROJECT_ROOT / "scripts" / "test_images"
-    output_dir.mkdir(exist_ok=True)
+    if debug:
+        output_dir.mkdir(exist_ok=True)
 
-    # At 400 DPI, let me estimate February section location
+    # Estimate February section location
     # February is middle column (roughly 1/3 to 2/3 of width)
     # Third row of months (roughly 52% to 68% of height based on 4 rows of months)
 
@@ -54,13 +130,14 @@ def analyze_specific_dates():
     feb_top = int(height * 0.55)
     feb_bottom = int(height * 0.68)
 
-    # Crop February
-    feb_section = img.crop((feb_left, feb_top, feb_right, feb_bottom))
-    feb_section.save(output_dir / "feb_section_400dpi.png")
-    print(f"Saved February section to: {output_dir / 'feb_section_400dpi.png'}")
+    # Crop February as a view of the page array; no pixel copy
+    feb_arr = arr[feb_top:feb_bottom, feb_left:feb_right]
+    if debug:
+        feb_path = output_dir / f"feb_section_{RENDER_DPI}dpi.png"
+        Image.fromarray(feb_arr).save(feb_path)
+        print(f"Saved February section to: {feb_path}")
 
     # Now let's analyze pixel colors from the February section
-    feb_arr = np.array(feb_section)
     feb_h, feb_w = feb_arr.shape[:2]
     print(f"February section dimensions: {feb_w}x{feb_h}")
 
@@ -69,35 +146,18 @@ def analyze_specific_dates():
     # Feb 16 is at row 3 (0-indexed: 2), column 2 (Monday, 0-indexed: 1)
     # Feb 17 is at row 3 (0-indexed: 2), column 3 (Tuesday, 0-indexed: 2)
 
-    # Estimate cell positions (row heights and column widths)
-    # There's a header row for the month name and day labels
-    header_height = feb_h * 0.20  # Top 20% for headers
-    cell_height = (feb_h - header_height) / 5  # 5 rows of dates
-    cell_width = feb_w / 7  # 7 columns
+    # Average every cell in one pass and classify them all
+    feb_means = cell_means(feb_arr)
+    feb_types = classify_colors(feb_means)
 
     def get_cell_color(row, col, name):
-        """Get average color of a cell."""
-        x_start = int(col * cell_width + cell_width * 0.2)
-        x_end = int(col * cell_width + cell_width * 0.8)
-        y_start = int(header_height + row * cell_height + cell_height * 0.2)
-        y_end = int(header_height + row * cell_height + cell_height * 0.8)
-
-        region = feb_arr[y_start:y_end, x_start:x_end]
-        avg_color = np.mean(region, axis=(0, 1))
-
-        # Classify the color
-        r, g, b = avg_color
-        if r > 240 and g > 240 and b > 240:
-            color_type = "WHITE"
-        elif r > 200 and g > 200 and b < 100:
-            color_type = "YELLOW"
-        elif b > r and b > g and b > 100:
-            color_type = "BLUE"
-        else:
-            color_type = "OTHER"
-
-        print(f"{name}: RGB({r:.0f}, {g:.0f}, {b:.0f}) = {color_type}")
-        return avg_color, color_type
+        """Report the average color of one cell."""
+        r, g, b = feb_means[row, col]
+        print(f"{name}: RGB({r:.0f}, {g:.0f}, {b:.0f}) = {feb_types[row, col]}")
+        return feb_means[row, col], feb_types[row, col]
+
+    print("\nFebruary cell colors (row = week, column = weekday):")
+    print_cell_grid(feb_types)
 
     print("\nAnalyzing specific date cells in February:")
     print("-" * 50)
@@ -124,36 +184,17 @@ def analyze_specific_dates():
     oct_top = int(height * 0.32)
     oct_bottom = int(height * 0.46)
 
-    oct_section = img.crop((oct_left, oct_top, oct_right, oct_bottom))
-    oct_section.save(output_dir / "oct_section_400dpi.png")
+    oct_arr = arr[oct_top:oct_bottom, oct_left:oct_right]
+    if debug:
+        Image.fromarray(oct_arr).save(output_dir / f"oct_section_{RENDER_DPI}dpi.png")
 
-    oct_arr = np.array(oct_section)
-    oct_h, oct_w = oct_arr.shape[:2]
-    oct_header_height = oct_h * 0.20
-    oct_cell_height = (oct_h - oct_header_height) / 5
-    oct_cell_width = oct_w / 7
+    oct_means = cell_means(oct_arr)
+    oct_types = classify_colors(oct_means)
 
     def get_oct_cell_color(row, col, name):
-        x_start = int(col * oct_cell_width + oct_cell_width * 0.2)
-        x_end = int(col * oct_cell_width + oct_cell_width * 0.8)
-        y_start = int(oct_header_height + row * oct_cell_height + oct_cell_height * 0.2)
-        y_end = int(oct_header_height + row * oct_cell_height + oct_cell_height * 0.8)
-
-        region = oct_arr[y_start:y_end, x_start:x_end]
-        avg_color = np.mean(region, axis=(0, 1))
-
-        r, g, b = avg_color
-        if r > 240 and g > 240 and b > 240:
-            color_type = "WHITE"
-        elif r > 200 and g > 200 and b < 100:
-            color_type = "YELLOW"
-        elif b > r and b > g and b > 100:
-            color_type = "BLUE"
-        else:
-            color_type = "OTHER"
-
-        print(f"{name}: RGB({r:.0f}, {g:.0f}, {b:.0f}) = {color_type}")
-        return avg_color, color_type
+        r, g, b = oct_means[row, col]
+        print(f"{name}: RGB({r:.0f}, {g:.0f}, {b:.0f}) = {oct_types[row, col]}")
+        return oct_means[row, col], oct_types[row, col]
 
     # Oct 6 - Row 1, Column 1 (Monday) - should be yellow
     get_oct_cell_color(1, 1, "Oct 6 (Mon, Teacher Workday)")
@@ -163,4 +204,8 @@ def analyze_specific_dates():
 
 
 if __name__ == "__main__":
-    analyze_specific_dates()
+    parser = argparse.ArgumentParser(description="Measure the pixel color of Feb 13 and reference cells")
+    parser.add_argument("--debug", action="store_true",
+                        help="Save the cropped February and October sections to scripts/test_images")
+    args = parser.parse_args()
+    analyze_specific_dates(debug=args.debug)
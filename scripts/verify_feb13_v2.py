@@ -3,69 +3,163 @@
 Extract the full February section correctly and analyze colors.
 """
 
+import argparse
+import io
 import os
+import subprocess
 import sys
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from pdf2image import convert_from_path
+from pdf2image import pdfinfo_from_path
 from PIL import Image
 import numpy as np
 
-PDF_PATH = PROJECT_ROOT / "Official_Calendars" / "Public" / "Butts" / "ButtsSchoolYearCalendar2025-2026_FINAL_Approved1112.pdf"
-
+try:
+    from numba import njit, prange
+except ImportError:  # optional; color_masks falls back to numpy
+    njit = None
 
-def analyze_calendar():
-    """Full analysis of the calendar image."""
-    print("Converting PDF at DPI 400...")
-    images = convert_from_path(str(PDF_PATH), dpi=400, poppler_path='/opt/homebrew/bin')
-    img = images[0]
-    arr = np.array(img)
+PDF_PATH = PROJECT_ROOT / "Official_Calendars" / "Public" / "Butts" / "ButtsSchoolYearCalendar2025-2026_FINAL_Approved1112.pdf"
+POPPLER_PATH = '/opt/homebrew/bin'
+
+# The third row of months (Jan/Feb/Mar), as fractions of the page height
+ROW3_TOP = 0.50
+ROW3_BOTTOM = 0.68
+
+# The masks only look for region-level yellow/blue fills, which are still
+# dozens of pixels across at 150 DPI; 400 DPI rendered ~7x the pixels
+RENDER_DPI = 150
+
+
+def render_row3(dpi: int) -> Image.Image:
+    """Render only the Jan/Feb/Mar band of page 1.
+
+    pdftoppm's -x/-y/-W/-H rasterize just that region, a fifth of the page,
+    instead of rendering the whole page and cropping it afterwards.
+    """
+    # "612 x 792 pts (letter)" -> page size in pixels at this DPI
+    info = pdfinfo_from_path(str(PDF_PATH), poppler_path=POPPLER_PATH)
+    page_w, page_h = (float(v) * dpi / 72 for v in info["Page size"].split()[0:3:2])
+    y = int(page_h * ROW3_TOP)
+    h = int(page_h * ROW3_BOTTOM) - y
+    png = subprocess.run(
+        [os.path.join(POPPLER_PATH, "pdftoppm"), "-png", "-r", str(dpi),
+         "-f", "1", "-l", "1", "-x", "0", "-y", str(y),
+         "-W", str(int(page_w)), "-H", str(h), str(PDF_PATH)],
+        check=True, capture_output=True,
+    ).stdout
+    return Image.open(io.BytesIO(png)).convert("RGB")
+
+
+# Color categories in _COLOR_LUT
+OTHER, YELLOW, BLUE = 0, 1, 2
+
+
+def _build_color_lut() -> np.ndarray:
+    """Category of every 5-5-5 bit RGB bucket, indexed by (R>>3)<<10 | (G>>3)<<5 | B>>3.
+
+    Each bucket of 8 levels per channel is classified by its centre value:
+    yellow is R>200, G>200, B<150; blue is B more than 20 above both R and G
+    and over 100.
+    """
+    centre = (np.arange(32, dtype=np.int16) << 3) + 4
+    r, g, b = centre[:, None, None], centre[None, :, None], centre[None, None, :]
+    yellow = (r > 200) & (g > 200) & (b < 150)
+    blue = (b > r + 20) & (b > g + 20) & (b > 100)
+    return np.select([yellow, blue], [YELLOW, BLUE], OTHER).astype(np.uint8).ravel()
+
+
+# 32 KB, so it stays cache-resident while every pixel is looked up in it
+_COLOR_LUT = _build_color_lut()
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _scan_color_masks(arr, lut):
+        """Yellow and blue masks in one pass over the pixels, rows in parallel."""
+        height, width = arr.shape[0], arr.shape[1]
+        yellow = np.zeros((height, width), np.bool_)
+        blue = np.zeros((height, width), np.bool_)
+        for y in prange(height):
+            for x in range(width):
+                category = lut[(np.int32(arr[y, x, 0]) >> 3) << 10
+                               | (np.int32(arr[y, x, 1]) >> 3) << 5
+                               | np.int32(arr[y, x, 2]) >> 3]
+                yellow[y, x] = category == YELLOW
+                blue[y, x] = category == BLUE
+        return yellow, blue
+
+
+def color_masks(arr: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Boolean (yellow, blue) masks for an RGB array, classified by _COLOR_LUT.
+
+    With numba installed this is a single fused kernel; otherwise each pixel
+    is packed to a 15-bit index and categorized with one LUT gather.
+    """
+    if njit is not None:
+        return _scan_color_masks(arr, _COLOR_LUT)
+    idx = (arr[..., 0] >> 3).astype(np.uint16) << 10
+    idx |= (arr[..., 1] >> 3).astype(np.uint16) << 5
+    idx |= arr[..., 2] >> 3
+    categories = _COLOR_LUT[idx]
+    return categories == YELLOW, categories == BLUE
+
+
+def bbox(mask: np.ndarray) -> tuple[int, int, int, int]:
+    """Inclusive (y_min, y_max, x_min, x_max) of the True pixels in a non-empty mask.
+
+    Reduces the mask to one flag per row and per column instead of
+    materializing a coordinate array for every True pixel, as np.where does.
+    """
+    rows = mask.any(axis=1)
+    cols = mask.any(axis=0)
+    return (
+        int(rows.argmax()), len(rows) - 1 - int(rows[::-1].argmax()),
+        int(cols.argmax()), len(cols) - 1 - int(cols[::-1].argmax()),
+    )
+
+
+def analyze_calendar(debug_images: bool = False):
+    """Full analysis of the calendar image.
+
+    With debug_images=True the row, February crop and color overlay are
+    also saved as PNGs.
+    """
+    print(f"Rendering the Jan/Feb/Mar row at DPI {RENDER_DPI}...")
+    # The only conversion to an array; every crop below is a view of it
+    arr = np.asarray(render_row3(RENDER_DPI))
 
     height, width = arr.shape[:2]
-    print(f"Image dimensions: {width}x{height}")
+    print(f"Row 3 dimensions: {width}x{height}")
 
     output_dir = PROJECT_ROOT / "scripts" / "test_images"
-    output_dir.mkdir(exist_ok=True)
-
-    # Let me try a different approach - crop a larger area that definitely includes Feb
-    # and save it so we can see the structure
+    if debug_images:
+        output_dir.mkdir(exist_ok=True)
 
     # The calendar has 4 rows of months (3 months per row):
     # Row 1: July, Aug, Sep
     # Row 2: Oct, Nov, Dec
     # Row 3: Jan, Feb, Mar
     # Row 4: Apr, May, Jun
-
-    # Each row is approximately 1/4 of the usable calendar area
-    # With headers and legend, usable area is roughly 15% to 85% of height
-
-    # Let's crop the third row (Jan/Feb/Mar) more precisely
-    # Looking at the layout, this row should be around 50-70% of height
-
-    # Crop the entire Jan/Feb/Mar row
-    row3_top = int(height * 0.50)
-    row3_bottom = int(height * 0.68)
-
-    row3_img = img.crop((0, row3_top, width, row3_bottom))
-    row3_img.save(output_dir / "row3_jan_feb_mar.png")
-    print(f"Saved Row 3 (Jan/Feb/Mar) to: {output_dir / 'row3_jan_feb_mar.png'}")
+    # The render is already just row 3 (ROW3_TOP to ROW3_BOTTOM of the page)
+    if debug_images:
+        Image.fromarray(arr).save(output_dir / "row3_jan_feb_mar.png")
+        print(f"Saved Row 3 (Jan/Feb/Mar) to: {output_dir / 'row3_jan_feb_mar.png'}")
 
     # Now let's look specifically at the February portion
     # February is in the middle third of the row
     feb_left = int(width * 0.33)
     feb_right = int(width * 0.66)
-    feb_top = row3_top
-    feb_bottom = row3_bottom
 
-    feb_full = img.crop((feb_left, feb_top, feb_right, feb_bottom))
-    feb_full.save(output_dir / "feb_full.png")
-    print(f"Saved February full section to: {output_dir / 'feb_full.png'}")
+    feb_arr = arr[:, feb_left:feb_right]
+    if debug_images:
+        Image.fromarray(feb_arr).save(output_dir / "feb_full.png")
+        print(f"Saved February full section to: {output_dir / 'feb_full.png'}")
 
     # Now analyze pixel colors in the February section
-    feb_arr = np.array(feb_full)
     feb_h, feb_w = feb_arr.shape[:2]
     print(f"\nFebruary section: {feb_w}x{feb_h}")
 
@@ -78,8 +172,7 @@ def analyze_calendar():
     print("\nScanning for colored pixels in February section...")
 
     # Create masks for different colors
-    yellow_mask = (feb_arr[:,:,0] > 200) & (feb_arr[:,:,1] > 200) & (feb_arr[:,:,2] < 150)
-    blue_mask = (feb_arr[:,:,2] > feb_arr[:,:,0] + 20) & (feb_arr[:,:,2] > feb_arr[:,:,1] + 20) & (feb_arr[:,:,2] > 100)
+    yellow_mask, blue_mask = color_masks(feb_arr)
 
     yellow_pixels = np.sum(yellow_mask)
     blue_pixels = np.sum(blue_mask)
@@ -89,14 +182,17 @@ def analyze_calendar():
 
     # Find the bounding boxes of colored regions
     if yellow_pixels > 0:
-        yellow_coords = np.where(yellow_mask)
-        print(f"Yellow region Y range: {yellow_coords[0].min()} to {yellow_coords[0].max()}")
-        print(f"Yellow region X range: {yellow_coords[1].min()} to {yellow_coords[1].max()}")
+        y_min, y_max, x_min, x_max = bbox(yellow_mask)
+        print(f"Yellow region Y range: {y_min} to {y_max}")
+        print(f"Yellow region X range: {x_min} to {x_max}")
 
     if blue_pixels > 0:
-        blue_coords = np.where(blue_mask)
-        print(f"Blue region Y range: {blue_coords[0].min()} to {blue_coords[0].max()}")
-        print(f"Blue region X range: {blue_coords[1].min()} to {blue_coords[1].max()}")
+        y_min, y_max, x_min, x_max = bbox(blue_mask)
+        print(f"Blue region Y range: {y_min} to {y_max}")
+        print(f"Blue region X range: {x_min} to {x_max}")
+
+    if not debug_images:
+        return
 
     # Create a visualization showing colored regions
     vis_arr = feb_arr.copy()
@@ -110,4 +206,8 @@ def analyze_calendar():
 
 
 if __name__ == "__main__":
-    analyze_calendar()
+    parser = argparse.ArgumentParser(description="Locate the yellow and blue cells in the February section")
+    parser.add_argument("--debug-images", action="store_true",
+                        help="Save the row, February crop and color overlay to scripts/test_images")
+    args = parser.parse_args()
+    analyze_calendar(debug_images=args.debug_images)
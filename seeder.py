@@ -5,169 +5,231 @@ This module seeds the production database with school calendar data if the table
 It runs automatically on app startup to ensure production has the same data as development.
 """
 
+import csv
+import io
 import json
 import os
-from datetime import datetime
+from datetime import date, datetime
+from operator import itemgetter
 from extensions import db
 from models import SchoolEntity, CalendarFile, VerifiedHoliday
 
+try:
+    import ijson
+except ImportError:  # optional; without it the seed file is loaded whole
+    ijson = None
+
 SEED_FILE = 'seed_data.json'
+# Rows handed to the database per insert when streaming the seed file
+SEED_BATCH_SIZE = 5000
+# Columns copied straight from each seed row. The exporter writes every
+# column, so these are fetched in one itemgetter call per row; only columns
+# with a default are looked up with .get
+SCHOOL_ENTITY_COLUMNS = ('id', 'district_name', 'normalized_name', 'county', 'nces_id',
+                         'website', 'official_website', 'calendar_page_url', 'slug',
+                         'created_at', 'updated_at')
+CALENDAR_FILE_COLUMNS = ('id', 'school_entity_id', 'school_year', 'filename', 'file_path',
+                         'file_type', 'file_size', 'created_at')
+VERIFIED_HOLIDAY_COLUMNS = ('id', 'school_entity_id', 'school_year', 'name', 'start_date',
+                            'end_date', 'source', 'confidence', 'created_at', 'updated_at')
+VERIFIED_BREAK_COLUMNS = ('id', 'district_name', 'normalized_district_name', 'school_year',
+                          'break_type', 'start_date', 'end_date', 'source', 'verified_by',
+                          'notes', 'created_at', 'updated_at')
+get_school_entity_columns = itemgetter(*SCHOOL_ENTITY_COLUMNS)
+get_calendar_file_columns = itemgetter(*CALENDAR_FILE_COLUMNS)
+get_verified_holiday_columns = itemgetter(*VERIFIED_HOLIDAY_COLUMNS)
+get_verified_break_columns = itemgetter(*VERIFIED_BREAK_COLUMNS)
+# Tables whose id sequence is moved past the seeded ids
+SEQUENCE_TABLES = ('school_entity', 'calendar_file', 'verified_holiday', 'verified_break')
 
 
-def parse_date(date_str):
-    """Parse ISO date string to date object."""
-    if not date_str:
+def parse_datetime(dt_str, _fromisoformat=datetime.fromisoformat):
+    """Parse an ISO datetime string from the seed file (a string or null)."""
+    if not dt_str:
         return None
-    if isinstance(date_str, str):
-        return datetime.fromisoformat(date_str.replace('Z', '+00:00')).date() if 'T' not in date_str else datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-    return date_str
+    return _fromisoformat(dt_str[:-1] + '+00:00' if dt_str[-1] == 'Z' else dt_str)
 
 
-def parse_datetime(dt_str):
-    """Parse ISO datetime string to datetime object."""
-    if not dt_str:
+def parse_date(date_str, _fromisoformat=date.fromisoformat):
+    """Parse an ISO date string from the seed file; full timestamps stay datetimes."""
+    if not date_str:
         return None
-    if isinstance(dt_str, str):
-        try:
-            return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
-        except:
-            return datetime.fromisoformat(dt_str)
-    return dt_str
+    if 'T' in date_str:
+        return parse_datetime(date_str)
+    return _fromisoformat(date_str)
+
+
+def iter_seed_batches(table, data=None):
+    """
+    Yield the seed rows of one table in lists of at most SEED_BATCH_SIZE.
+    Rows come from the already-loaded data when given, otherwise they are
+    streamed from SEED_FILE with ijson, so only one batch is held in memory.
+    """
+    if data is not None:
+        rows = data.get(table, [])
+        for i in range(0, len(rows), SEED_BATCH_SIZE):
+            yield rows[i:i + SEED_BATCH_SIZE]
+        return
+    
+    # ijson only scans forward, so each table re-reads the file
+    with open(SEED_FILE, 'rb') as f:
+        batch = []
+        for row in ijson.items(f, f'{table}.item', use_float=True):
+            batch.append(row)
+            if len(batch) >= SEED_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def copy_rows(model, rows):
+    """
+    Load a list of column dicts into the model's table with PostgreSQL COPY.
+    Runs on the session's connection, so it commits with the session.
+    """
+    columns = list(rows[0])
+    buf = io.StringIO()
+    # csv writes None and '' the same way, so NULLs get COPY's \N marker
+    csv.writer(buf).writerows(
+        [r'\N' if row[c] is None else row[c] for c in columns] for row in rows
+    )
+    buf.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {model.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buf
+        )
+    finally:
+        cursor.close()
+
+
+def insert_rows(model, rows, use_bulk=True):
+    """
+    Add a list of column dicts for a model to the session.
+    With use_bulk, rows are streamed in with COPY on PostgreSQL and go through
+    bulk_insert_mappings elsewhere; both skip the identity map and per-object
+    bookkeeping. COPY also skips Python-side column defaults, so every row
+    must carry all of its columns; ORM events and relationships are not
+    processed either way.
+    """
+    if not rows:
+        return
+    if use_bulk and db.session.get_bind().dialect.name == 'postgresql':
+        copy_rows(model, rows)
+    elif use_bulk:
+        db.session.bulk_insert_mappings(model, rows)
+    else:
+        db.session.add_all(model(**row) for row in rows)
 
 
-def seed_database():
+def seed_database(use_bulk=True):
     """
     Seeds the database with school calendar data if tables are empty.
     Returns True if seeding occurred, False if tables already had data.
+    Pass use_bulk=False to insert through ORM objects instead of bulk mappings.
+    All tables and the sequence reset are written in a single transaction.
     """
     # Check if seed file exists
     if not os.path.exists(SEED_FILE):
         print(f"[Seeder] No seed file found at {SEED_FILE}")
         return False
     
-    # Check if school_entity table is empty
-    existing_count = SchoolEntity.query.count()
-    if existing_count > 0:
-        print(f"[Seeder] Database already has {existing_count} school entities. Skipping seed.")
+    # Check if school_entity table is empty; fetching one id stops at the
+    # first row instead of counting the whole table
+    if db.session.query(SchoolEntity.id).limit(1).scalar() is not None:
+        print("[Seeder] Database already has school entities. Skipping seed.")
         return False
     
     print("[Seeder] Database is empty. Starting seed process...")
     
-    # Load seed data
-    with open(SEED_FILE, 'r') as f:
-        data = json.load(f)
+    # Load seed data; with ijson each table is streamed instead
+    data = None
+    if ijson is None:
+        with open(SEED_FILE, 'r') as f:
+            data = json.load(f)
     
     # Seed school_entity table
-    school_entities = data.get('school_entity', [])
-    print(f"[Seeder] Importing {len(school_entities)} school entities...")
-    
-    for entity in school_entities:
-        school = SchoolEntity(
-            id=entity['id'],
-            entity_type=entity.get('entity_type', 'district'),
-            district_name=entity['district_name'],
-            normalized_name=entity.get('normalized_name'),
-            county=entity.get('county'),
-            nces_id=entity.get('nces_id'),
-            is_active=entity.get('is_active', True),
-            website=entity.get('website'),
-            official_website=entity.get('official_website'),
-            calendar_page_url=entity.get('calendar_page_url'),
-            slug=entity.get('slug'),
-            created_at=parse_datetime(entity.get('created_at')),
-            updated_at=parse_datetime(entity.get('updated_at'))
-        )
-        db.session.add(school)
-    
-    db.session.commit()
-    print(f"[Seeder] Imported {len(school_entities)} school entities")
+    print("[Seeder] Importing school entities...")
+    count = 0
+    for batch in iter_seed_batches('school_entity', data):
+        rows = []
+        for entity in batch:
+            row = dict(zip(SCHOOL_ENTITY_COLUMNS, get_school_entity_columns(entity)))
+            row['entity_type'] = entity.get('entity_type', 'district')
+            row['is_active'] = entity.get('is_active', True)
+            row['created_at'] = parse_datetime(row['created_at'])
+            row['updated_at'] = parse_datetime(row['updated_at'])
+            rows.append(row)
+        insert_rows(SchoolEntity, rows, use_bulk)
+        count += len(rows)
+    
+    print(f"[Seeder] Imported {count} school entities")
     
     # Seed calendar_file table
-    calendar_files = data.get('calendar_file', [])
-    print(f"[Seeder] Importing {len(calendar_files)} calendar files...")
-    
-    for cf in calendar_files:
-        cal_file = CalendarFile(
-            id=cf['id'],
-            school_entity_id=cf['school_entity_id'],
-            school_year=cf.get('school_year'),
-            filename=cf.get('filename'),
-            file_path=cf.get('file_path'),
-            file_type=cf.get('file_type'),
-            file_size=cf.get('file_size'),
-            created_at=parse_datetime(cf.get('created_at'))
-        )
-        db.session.add(cal_file)
-    
-    db.session.commit()
-    print(f"[Seeder] Imported {len(calendar_files)} calendar files")
+    print("[Seeder] Importing calendar files...")
+    count = 0
+    for batch in iter_seed_batches('calendar_file', data):
+        rows = []
+        for cf in batch:
+            row = dict(zip(CALENDAR_FILE_COLUMNS, get_calendar_file_columns(cf)))
+            row['created_at'] = parse_datetime(row['created_at'])
+            rows.append(row)
+        insert_rows(CalendarFile, rows, use_bulk)
+        count += len(rows)
+    
+    print(f"[Seeder] Imported {count} calendar files")
     
     # Seed verified_holiday table
-    holidays = data.get('verified_holiday', [])
-    print(f"[Seeder] Importing {len(holidays)} verified holidays...")
-    
-    for h in holidays:
-        holiday = VerifiedHoliday(
-            id=h['id'],
-            school_entity_id=h['school_entity_id'],
-            school_year=h.get('school_year'),
-            name=h['name'],
-            start_date=parse_date(h['start_date']),
-            end_date=parse_date(h['end_date']),
-            is_verified=h.get('is_verified', True),
-            source=h.get('source'),
-            confidence=h.get('confidence'),
-            created_at=parse_datetime(h.get('created_at')),
-            updated_at=parse_datetime(h.get('updated_at'))
-        )
-        db.session.add(holiday)
-    
-    db.session.commit()
-    print(f"[Seeder] Imported {len(holidays)} verified holidays")
+    print("[Seeder] Importing verified holidays...")
+    count = 0
+    for batch in iter_seed_batches('verified_holiday', data):
+        rows = []
+        for h in batch:
+            row = dict(zip(VERIFIED_HOLIDAY_COLUMNS, get_verified_holiday_columns(h)))
+            row['start_date'] = parse_date(row['start_date'])
+            row['end_date'] = parse_date(row['end_date'])
+            row['is_verified'] = h.get('is_verified', True)
+            row['created_at'] = parse_datetime(row['created_at'])
+            row['updated_at'] = parse_datetime(row['updated_at'])
+            rows.append(row)
+        insert_rows(VerifiedHoliday, rows, use_bulk)
+        count += len(rows)
+    
+    print(f"[Seeder] Imported {count} verified holidays")
     
     # Seed verified_break table (no model, use raw SQL)
-    breaks = data.get('verified_break', [])
-    print(f"[Seeder] Importing {len(breaks)} verified breaks...")
-    
-    for b in breaks:
+    print("[Seeder] Importing verified breaks...")
+    count = 0
+    for batch in iter_seed_batches('verified_break', data):
         db.session.execute(db.text("""
             INSERT INTO verified_break (id, district_name, normalized_district_name, school_year, 
                 break_type, start_date, end_date, source, verified_by, notes, created_at, updated_at)
             VALUES (:id, :district_name, :normalized_district_name, :school_year, 
                 :break_type, :start_date, :end_date, :source, :verified_by, :notes, :created_at, :updated_at)
-        """), {
-            'id': b['id'],
-            'district_name': b.get('district_name'),
-            'normalized_district_name': b.get('normalized_district_name'),
-            'school_year': b.get('school_year'),
-            'break_type': b.get('break_type'),
-            'start_date': b.get('start_date'),
-            'end_date': b.get('end_date'),
-            'source': b.get('source'),
-            'verified_by': b.get('verified_by'),
-            'notes': b.get('notes'),
-            'created_at': b.get('created_at'),
-            'updated_at': b.get('updated_at')
-        })
+        """), [dict(zip(VERIFIED_BREAK_COLUMNS, get_verified_break_columns(b))) for b in batch])
+        count += len(batch)
     
-    db.session.commit()
-    print(f"[Seeder] Imported {len(breaks)} verified breaks")
+    print(f"[Seeder] Imported {count} verified breaks")
     
-    # Reset sequences for PostgreSQL
+    # Reset sequences for PostgreSQL. The savepoint keeps a failure here
+    # (e.g. no sequences on SQLite) from aborting the seeded rows
     try:
-        max_school = db.session.execute(db.text("SELECT MAX(id) FROM school_entity")).scalar() or 0
-        max_calendar = db.session.execute(db.text("SELECT MAX(id) FROM calendar_file")).scalar() or 0
-        max_holiday = db.session.execute(db.text("SELECT MAX(id) FROM verified_holiday")).scalar() or 0
-        max_break = db.session.execute(db.text("SELECT MAX(id) FROM verified_break")).scalar() or 0
-        
-        db.session.execute(db.text(f"SELECT setval('school_entity_id_seq', {max_school})"))
-        db.session.execute(db.text(f"SELECT setval('calendar_file_id_seq', {max_calendar})"))
-        db.session.execute(db.text(f"SELECT setval('verified_holiday_id_seq', {max_holiday})"))
-        db.session.execute(db.text(f"SELECT setval('verified_break_id_seq', {max_break})"))
-        db.session.commit()
+        with db.session.begin_nested():
+            # One round-trip for all four tables; an empty table restarts at 1
+            setvals = ", ".join(
+                f"setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 1), "
+                f"(SELECT MAX(id) FROM {table}) IS NOT NULL)"
+                for table in SEQUENCE_TABLES
+            )
+            db.session.execute(db.text(f"SELECT {setvals}"))
         print("[Seeder] Reset ID sequences")
     except Exception as e:
         print(f"[Seeder] Warning: Could not reset sequences: {e}")
     
+    # Everything above is one transaction, committed once
+    db.session.commit()
     print("[Seeder] Database seeding complete!")
     return True
@@ -0,0 +1,17 @@
+from datetime import date
+
+from verified_calendars import detect_school_year
+
+
+def test_full_year_wins_over_earlier_abbreviated_year():
+    text = "Revised 2024-25 board approval ... 2025-2026 School Calendar"
+    assert detect_school_year(text, date(2023, 1, 1)) == "2025-2026"
+
+
+def test_abbreviated_year_used_when_no_full_year():
+    assert detect_school_year("School Calendar 2025/26", date(2023, 1, 1)) == "2025-2026"
+
+
+def test_fallback_to_reference_date():
+    assert detect_school_year("no year here", date(2025, 9, 1)) == "2025-2026"
+    assert detect_school_year("no year here", date(2026, 3, 1)) == "2025-2026"
@@ -9,11 +9,26 @@ Auto-generated from: Georgia Private and Public School Calendars.csv
 """
 
 import re
-from typing import Optional, List, Dict
+from bisect import bisect_right
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, List, Dict, Final, Mapping, NamedTuple, Tuple
 from datetime import date, timedelta
 
-# Normalized school names (lowercase) mapped to display names
-VERIFIED_SCHOOLS = {
+try:
+    import ahocorasick
+except ImportError:  # optional; find_verified_school falls back to substring checks
+    ahocorasick = None
+
+try:
+    from sqlalchemy.exc import SQLAlchemyError
+    from models import SchoolEntity, VerifiedHoliday
+    _DB_AVAILABLE = True
+except ImportError:  # optional; scripts use the hardcoded data without the app installed
+    _DB_AVAILABLE = False
+
+# Normalized school names (lowercase) mapped to display names; read-only
+VERIFIED_SCHOOLS: Final[Mapping[str, str]] = MappingProxyType({
     "baldwin county schools": "Baldwin County Schools",
     "barrow county school system": "Barrow County School System",
     "cherokee county school district": "Cherokee County School District",
@@ -46,43 +61,47 @@ VERIFIED_SCHOOLS = {
     "walton county school district": "Walton County School District",
     "washington county schools": "Washington County Schools",
     "wilkinson county schools": "Wilkinson County Schools",
-}
+})
 
-# County name keywords for fuzzy matching
-COUNTY_KEYWORDS = {
-    "baldwin": "baldwin county schools",
-    "barrow": "barrow county school system",
-    "cherokee": "cherokee county school district",
-    "clarke": "clarke county school district",
-    "clayton": "clayton county public schools",
-    "cobb": "cobb county school district",
-    "dawson": "dawson county schools",
-    "dekalb": "dekalb county school district",
-    "douglas": "douglas county school system",
-    "forsyth": "forsyth county schools",
-    "fulton": "fulton county schools",
-    "greater atlanta christian": "greater atlanta christian school",
-    "greene": "greene county school system",
-    "gwinnett": "gwinnett county public schools",
-    "hall": "hall county schools",
-    "hancock": "hancock county schools",
-    "henry": "henry county schools",
-    "houston": "houston county school district",
-    "jackson": "jackson county school system",
-    "jasper": "jasper county charter system",
-    "jones": "jones county school system",
-    "lumpkin": "lumpkin county school system",
-    "madison": "madison county school system",
-    "morgan": "morgan county charter schools",
-    "newton": "newton county schools",
-    "oconee": "oconee county schools",
-    "oglethorpe": "oglethorpe county schools",
-    "putnam": "putnam county charter school system",
-    "rockdale": "rockdale county public schools",
-    "walton": "walton county school district",
-    "washington": "washington county schools",
-    "wilkinson": "wilkinson county schools",
-}
+
+def _county_keyword(school_name: str) -> str:
+    """The county name in a normalized school name, or the name minus its "school" suffix."""
+    if " county " in school_name:
+        return school_name.split(" county ", 1)[0]
+    return school_name.rsplit(" school", 1)[0]
+
+
+# County name keywords for fuzzy matching, derived from VERIFIED_SCHOOLS so
+# the two can't drift apart; read-only
+COUNTY_KEYWORDS: Final[Mapping[str, str]] = MappingProxyType(
+    {_county_keyword(school_name): school_name for school_name in VERIFIED_SCHOOLS}
+)
+
+
+# Words showing the OCR text is about a school system, not just a place name
+_CONTEXT_WORDS = ("school", "district", "county", "system", "charter")
+
+# Automaton value for any of the _CONTEXT_WORDS
+_CONTEXT_HIT = (-1, None)
+
+
+@lru_cache(maxsize=1)
+def _county_automaton():
+    """
+    Aho-Corasick automaton over COUNTY_KEYWORDS and _CONTEXT_WORDS, so one
+    pass over the OCR text finds every keyword and context word. Each keyword
+    maps to (position in COUNTY_KEYWORDS, normalized school name); context
+    words map to _CONTEXT_HIT. Built on first use; None without pyahocorasick.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for priority, (county_keyword, school_name) in enumerate(COUNTY_KEYWORDS.items()):
+        automaton.add_word(county_keyword, (priority, school_name))
+    for word in _CONTEXT_WORDS:
+        automaton.add_word(word, _CONTEXT_HIT)
+    automaton.make_automaton()
+    return automaton
 
 # Verified holiday data organized by school year, then by school
 VERIFIED_HOLIDAYS = {
@@ -610,30 +629,100 @@ VERIFIED_HOLIDAYS = {
 }
 
 
+@lru_cache(maxsize=None)
+def _iso_ordinal(iso_date: str) -> int:
+    """Ordinal of a YYYY-MM-DD string. Cached, so each distinct date is parsed once and shares one int."""
+    return date.fromisoformat(iso_date).toordinal()
+
+
+class _SchoolCalendar(NamedTuple):
+    """
+    Every verified holiday of one school across all school years, as parallel
+    tuples sorted by start date. The holidays already carry 'verified': True.
+    """
+    starts: Tuple[int, ...]
+    ends: Tuple[int, ...]
+    holidays: Tuple[Dict, ...]
+
+
+@lru_cache(maxsize=1)
+def _school_calendars() -> Dict[str, _SchoolCalendar]:
+    """
+    school -> _SchoolCalendar built from VERIFIED_HOLIDAYS, so a 24-month
+    lookup is one dict access and needs no sorting. Built on first use rather
+    than at import, so processes that never look up a calendar don't pay for
+    parsing every date. The sort is stable, so equal start dates keep the
+    order they have in VERIFIED_HOLIDAYS.
+    """
+    by_school = {}
+    for schools in VERIFIED_HOLIDAYS.values():
+        for school_name, holidays in schools.items():
+            by_school.setdefault(school_name, []).extend(
+                (_iso_ordinal(h['startDate']), _iso_ordinal(h['endDate']), {**h, 'verified': True})
+                for h in holidays
+            )
+    calendars = {}
+    for school_name, rows in by_school.items():
+        rows.sort(key=lambda row: row[0])
+        calendars[school_name] = _SchoolCalendar(*(tuple(column) for column in zip(*rows)))
+    return calendars
+
+
+@lru_cache(maxsize=1)
+def _calendars_by_school_year() -> Dict[Tuple[str, str], List[Dict]]:
+    """(school, school year) -> that school's VERIFIED_HOLIDAYS list, so get_verified_calendar is one dict access."""
+    return {
+        (school_name, school_year): holidays
+        for school_year, year_data in VERIFIED_HOLIDAYS.items()
+        for school_name, holidays in year_data.items()
+    }
+
+
+@lru_cache(maxsize=256)
 def find_verified_school(ocr_text: str) -> Optional[str]:
     """
     Fuzzy match OCR text against known school names.
     Matches on key terms like county name + "school"/"county".
     Returns normalized school name if found, None otherwise.
+    Results are cached per text, since the same calendar is often uploaded again.
     """
     if not ocr_text:
         return None
 
     text_lower = ocr_text.lower()
 
-    # First try: match on county keyword + school indicator
-    for county_keyword, school_name in COUNTY_KEYWORDS.items():
-        if county_keyword in text_lower:
-            # Check for school-related context
-            if any(word in text_lower for word in ["school", "district", "county", "system", "charter"]):
-                return school_name
+    # First try: match on county keyword + school indicator. When several
+    # keywords occur, the one listed first in COUNTY_KEYWORDS wins
+    automaton = _county_automaton()
+    if automaton is not None:
+        hits = {value for _, value in automaton.iter(text_lower)}
+        has_context = _CONTEXT_HIT in hits
+        hits.discard(_CONTEXT_HIT)
+        county_match = min(hits)[1] if hits else None
+    else:
+        # No keyword counts without context, so skip the keyword scan entirely
+        # when the text has no context word
+        has_context = any(word in text_lower for word in _CONTEXT_WORDS)
+        if not has_context:
+            return None
+        county_match = next(
+            (school_name for county_keyword, school_name in COUNTY_KEYWORDS.items()
+             if county_keyword in text_lower),
+            None
+        )
+    # Only count the keyword when there is school-related context
+    if county_match and has_context:
+        return county_match
+
+    # No separate scan for full school names is needed: every name in
+    # VERIFIED_SCHOOLS contains its county keyword and a context word, so
+    # any text containing a full name has already matched above
+    return None
 
-    # Second try: exact substring match of full school name
-    for school_name in VERIFIED_SCHOOLS.keys():
-        if school_name in text_lower:
-            return school_name
 
-    return None
+# School year patterns for detect_school_year, compiled once
+_FULL_YEAR_RE = re.compile(r'20(\d{2})[-/]20(\d{2})')
+_ABBREV_YEAR_RE = re.compile(r'20(\d{2})[-/](\d{2})')
 
 
 def detect_school_year(ocr_text: str, reference_date: date = None) -> str:
@@ -647,12 +736,8 @@ def detect_school_year(ocr_text: str, reference_date: date = None) -> str:
     Returns:
         School year string in format "YYYY-YYYY" (e.g., "2025-2026")
     """
-    if reference_date is None:
-        reference_date = date.today()
-
     # Pattern 1: Full year format "2025-2026" or "2025/2026"
-    full_year_pattern = r'20(\d{2})[-/]20(\d{2})'
-    match = re.search(full_year_pattern, ocr_text)
+    match = _FULL_YEAR_RE.search(ocr_text)
     if match:
         year1 = 2000 + int(match.group(1))
         year2 = 2000 + int(match.group(2))
@@ -660,8 +745,7 @@ def detect_school_year(ocr_text: str, reference_date: date = None) -> str:
             return f"{year1}-{year2}"
 
     # Pattern 2: Abbreviated format "2025-26" or "2025/26"
-    abbrev_pattern = r'20(\d{2})[-/](\d{2})'
-    match = re.search(abbrev_pattern, ocr_text)
+    match = _ABBREV_YEAR_RE.search(ocr_text)
     if match:
         year1 = 2000 + int(match.group(1))
         year2_suffix = int(match.group(2))
@@ -669,6 +753,10 @@ def detect_school_year(ocr_text: str, reference_date: date = None) -> str:
         if year2 == year1 + 1:
             return f"{year1}-{year2}"
 
+    # Only needed for the fallback, so not looked up when the text has a year
+    if reference_date is None:
+        reference_date = date.today()
+
     # Fallback: infer from reference date
     if reference_date.month >= 8:
         return f"{reference_date.year}-{reference_date.year + 1}"
@@ -687,14 +775,36 @@ def get_verified_calendar(school_name: str, school_year: str) -> Optional[List[D
     Returns:
         List of holiday dicts with name, startDate, endDate fields, or None if not found
     """
-    if school_year not in VERIFIED_HOLIDAYS:
+    return _calendars_by_school_year().get((school_name, school_year))
+
+
+@lru_cache(maxsize=512)
+def _calendar_24_months(school_name: str, window_start: int) -> Optional[Tuple[Dict, ...]]:
+    """
+    Holidays of school_name overlapping the ~24 months from ordinal day
+    window_start, cached per (school, day). The dicts are the index's own
+    records, so get_verified_calendar_24_months hands out copies.
+    """
+    window_end = window_start + 730  # ~24 months
+
+    calendar = _school_calendars().get(school_name)
+    if calendar is None:
         return None
 
-    year_data = VERIFIED_HOLIDAYS[school_year]
-    if school_name not in year_data:
+    # Holidays are sorted by start, so everything from here on starts after the window
+    stop = bisect_right(calendar.starts, window_end)
+    all_holidays = tuple(
+        calendar.holidays[i]
+        for i in range(stop)
+        # Include if holiday overlaps with our 24-month window
+        if calendar.ends[i] >= window_start
+    )
+
+    if not all_holidays:
         return None
 
-    return year_data[school_name]
+    # Already in start date order, from the index
+    return all_holidays
 
 
 def get_verified_calendar_24_months(school_name: str, reference_date: date = None) -> Optional[List[Dict]]:
@@ -711,29 +821,12 @@ def get_verified_calendar_24_months(school_name: str, reference_date: date = Non
     if reference_date is None:
         reference_date = date.today()
 
-    end_date = reference_date + timedelta(days=730)  # ~24 months
-
-    all_holidays = []
-
-    for school_year in VERIFIED_HOLIDAYS.keys():
-        year_data = VERIFIED_HOLIDAYS[school_year]
-        if school_name not in year_data:
-            continue
-
-        for holiday in year_data[school_name]:
-            holiday_start = date.fromisoformat(holiday['startDate'])
-            holiday_end = date.fromisoformat(holiday['endDate'])
-
-            # Include if holiday overlaps with our 24-month window
-            if holiday_end >= reference_date and holiday_start <= end_date:
-                all_holidays.append({**holiday, 'verified': True})
-
-    if not all_holidays:
+    holidays = _calendar_24_months(school_name, reference_date.toordinal())
+    if holidays is None:
         return None
 
-    # Sort by start date
-    all_holidays.sort(key=lambda h: h['startDate'])
-    return all_holidays
+    # Callers annotate the returned dicts, so never give out the cached ones
+    return [dict(holiday) for holiday in holidays]
 
 
 def get_display_name(normalized_name: str) -> str:
@@ -741,19 +834,37 @@ def get_display_name(normalized_name: str) -> str:
     return VERIFIED_SCHOOLS.get(normalized_name, normalized_name.title())
 
 
-def list_verified_schools() -> List[str]:
-    """Return list of all verified school names (display format)."""
-    return list(VERIFIED_SCHOOLS.values())
+# Both are fixed for the life of the process, so build them once
+_VERIFIED_NAMES: Final[Tuple[str, ...]] = tuple(VERIFIED_SCHOOLS.values())
+_AVAILABLE_YEARS: Final[Tuple[str, ...]] = tuple(sorted(VERIFIED_HOLIDAYS))
 
 
-def list_available_years() -> List[str]:
-    """Return list of all available school years."""
-    return sorted(VERIFIED_HOLIDAYS.keys())
+def list_verified_schools() -> Tuple[str, ...]:
+    """Return all verified school names (display format)."""
+    return _VERIFIED_NAMES
+
+
+def list_available_years() -> Tuple[str, ...]:
+    """Return all available school years, oldest first."""
+    return _AVAILABLE_YEARS
 
 
 # ===== DATABASE-BACKED FUNCTIONS =====
 # These functions use the database when available, with fallback to hardcoded data
 
+@lru_cache(maxsize=512)
+def _first_token(school_name: str) -> str:
+    """Leading word of a school name, splitting on spaces or underscores (usually the county)."""
+    return school_name.replace(' ', '_').partition('_')[0]
+
+
+def _resolve_entity_id(name_token: str) -> Optional[int]:
+    """Id of the first SchoolEntity whose normalized name starts with name_token."""
+    return SchoolEntity.query.with_entities(SchoolEntity.id).filter(
+        SchoolEntity.normalized_name.like(f"{name_token}%")
+    ).limit(1).scalar()
+
+
 def get_verified_calendar_from_db(school_name: str, reference_date: date = None) -> Optional[List[Dict]]:
     """
     Get verified holiday dates from database for a school, spanning 24 months.
@@ -765,51 +876,48 @@ def get_verified_calendar_from_db(school_name: str, reference_date: date = None)
     Returns:
         List of holiday dicts sorted by startDate, or None if school not found
     """
-    try:
-        from flask import current_app
-        from models import SchoolEntity, VerifiedHoliday
+    if reference_date is None:
+        reference_date = date.today()
 
-        if reference_date is None:
-            reference_date = date.today()
+    if not _DB_AVAILABLE:
+        return get_verified_calendar_24_months(school_name, reference_date)
 
-        end_date = reference_date + timedelta(days=730)
+    end_date = reference_date + timedelta(days=730)
 
+    try:
         # Find the school entity by normalized name
-        normalized = school_name.replace(' ', '_')
-        entity = SchoolEntity.query.filter(
-            SchoolEntity.normalized_name.like(f"%{normalized.split('_')[0]}%")
-        ).first()
+        entity_id = _resolve_entity_id(_first_token(school_name))
 
-        if not entity:
+        if entity_id is None:
             # Fallback to hardcoded data
             return get_verified_calendar_24_months(school_name, reference_date)
 
         # Get holidays from database
         holidays = VerifiedHoliday.query.filter_by(
-            school_entity_id=entity.id
+            school_entity_id=entity_id
         ).filter(
             VerifiedHoliday.end_date >= reference_date,
             VerifiedHoliday.start_date <= end_date
         ).order_by(VerifiedHoliday.start_date).all()
+    except (SQLAlchemyError, RuntimeError):
+        # Fallback to hardcoded data if database not available (RuntimeError:
+        # called outside an app context)
+        return get_verified_calendar_24_months(school_name, reference_date)
 
-        if not holidays:
-            # Fallback to hardcoded data
-            return get_verified_calendar_24_months(school_name, reference_date)
-
-        return [
-            {
-                'name': h.name,
-                'startDate': h.start_date.isoformat(),
-                'endDate': h.end_date.isoformat(),
-                'verified': True
-            }
-            for h in holidays
-        ]
-
-    except Exception:
-        # Fallback to hardcoded data if database not available
+    if not holidays:
+        # Fallback to hardcoded data
         return get_verified_calendar_24_months(school_name, reference_date)
 
+    return [
+        {
+            'name': h.name,
+            'startDate': h.start_date.isoformat(),
+            'endDate': h.end_date.isoformat(),
+            'verified': True
+        }
+        for h in holidays
+    ]
+
 
 def get_school_entity_by_name(school_name: str):
     """
@@ -817,20 +925,22 @@ def get_school_entity_by_name(school_name: str):
 
     Returns the entity object or None if not found.
     """
-    try:
-        from models import SchoolEntity
+    if not _DB_AVAILABLE:
+        return None
 
+    try:
         # Try exact match first
         normalized = school_name.replace(' ', '_')
         entity = SchoolEntity.query.filter_by(normalized_name=normalized).first()
 
         if not entity:
-            # Try partial match
+            # Try partial match on the leading name token (usually the county).
+            # A prefix pattern can use ix_school_entity_normalized_name_pattern
             entity = SchoolEntity.query.filter(
-                SchoolEntity.normalized_name.like(f"%{normalized.split('_')[0]}%")
+                SchoolEntity.normalized_name.like(f"{_first_token(school_name)}%")
             ).first()
 
         return entity
 
-    except Exception:
+    except (SQLAlchemyError, RuntimeError):
         return None